@@ -0,0 +1,28 @@
+
+
+
+## Budget
+## ========================================================================
+class Budget:
+	""" a bounded work budget, counting the attempts (iterations, retries) of an iterative search """
+
+	## __init__
+	## --------------------------------------------------------------------
+	def __init__(self, limit=None):
+		""" constructor """
+		self.limit = limit ## maximum number of attempts (None if unbounded)
+		self.used  = 0     ## number of attempts made so far
+
+	## exhausted
+	## --------------------------------------------------------------------
+	def exhausted(self):
+		""" checks if all attempts have been used """
+		return self.limit is not None and self.used >= self.limit
+
+	## spend
+	## --------------------------------------------------------------------
+	def spend(self):
+		""" uses one attempt, returns False (without using it) if the budget is exhausted already """
+		if self.exhausted(): return False
+		self.used += 1
+		return True
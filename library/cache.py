@@ -1,3 +1,5 @@
+import bisect
+import heapq
 import os
 
 from library.condition import Condition
@@ -18,9 +20,18 @@ class Collection:
 	## --------------------------------------------------------------------
 	def __init__(self, aps, name):
 		""" constructor """
-		self.aps  = aps
-		self.name = name
-		self.data = {}
+		self.aps     = aps
+		self.name    = name
+		self.data    = {}
+		self.index   = {} ## elements by their key, in the order of insertion (only for elements that define one)
+		self.buckets = {} ## (score, position, element) per bucket in score order (only for elements that define a bucket)
+		self.order   = {} ## position of each entry in the order of insertion
+
+	## __contains__
+	## --------------------------------------------------------------------
+	def __contains__(self, elem):
+		""" checks if an element equal to the given one is in the collection """
+		return self.find(elem) is not None
 
 	## __iter__
 	## --------------------------------------------------------------------
@@ -35,6 +46,22 @@ class Collection:
 		""" length """
 		return len(self.data.keys())
 
+	## find
+	## --------------------------------------------------------------------
+	def find(self, elem):
+		""" retrieves the stored element equal to the given one (None if not found) """
+		candidates = self.index.get(elem.key(), []) if hasattr(elem, "key") else self.data.values()
+		for v in candidates:
+			if v == elem: return v
+		return None
+
+	## findKey
+	## --------------------------------------------------------------------
+	def findKey(self, key):
+		""" retrieves the first element with the given key (None if not found) """
+		elems = self.index.get(key)
+		return elems[0] if elems else None
+
 	## get
 	## --------------------------------------------------------------------
 	def get(self, key):
@@ -46,7 +73,7 @@ class Collection:
 	## --------------------------------------------------------------------
 	def has(self, key):
 		""" checks if an element exists in the collection """
-		return key in self.data.keys()
+		return key in self.data
 
 	## load
 	## --------------------------------------------------------------------
@@ -55,7 +82,7 @@ class Collection:
 		link = self.aps.task if toLink=="task" else getattr(self.aps, toLink) if toLink in self.aps.components else self.aps
 		for entry in jin:
 			for k,v in entry.items():
-				self.data[k] = comp(link, fromDict=v)
+				self.set(k, comp(link, fromDict=v))
 
 	## save
 	## --------------------------------------------------------------------
@@ -70,7 +97,23 @@ class Collection:
 	## --------------------------------------------------------------------
 	def set(self, key, comp):
 		""" adds a new element to the collection """
+		old = self.data.get(key)
+		if old is comp: return
+		## an element is replaced: it keeps its position, but needs to be removed from the indices
+		if old is not None:
+			if hasattr(old, "key"   ): self.index[old.key()].remove(old)
+			if hasattr(old, "bucket"): self.buckets[old.bucket()].remove((old.score, self.order[key], old))
 		self.data[key] = comp
+		if key not in self.order: self.order[key] = len(self.order)
+		if hasattr(comp, "key"   ): self.index.setdefault(comp.key(), []).append(comp)
+		if hasattr(comp, "bucket"): bisect.insort(self.buckets.setdefault(comp.bucket(), []), (comp.score, self.order[key], comp))
+
+	## sortedIn
+	## --------------------------------------------------------------------
+	def sortedIn(self, buckets):
+		""" returns the elements of the given buckets in score order (equal scores in the order of insertion) """
+		entries = [self.buckets[x] for x in buckets if x in self.buckets]
+		return [x[2] for x in heapq.merge(*entries)]
 
 
 
@@ -15,22 +15,19 @@ class Component(object):
 		self.allMoves = None      ## collection of all available moves (working memory)
 		self.recent   = None      ## the move done most recently
 		self.move     = None      ## the current move
+		self.memo     = None      ## memo of probed outcomes (if the component keeps one)
 
 	## findMove
 	## --------------------------------------------------------------------
 	def findMove(self, other):
 		""" find this version of an existing move """
-		for move in self.allMoves:
-			if move == other: return move
-		return None
+		return self.allMoves.find(other)
 
 	## getMove
 	## --------------------------------------------------------------------
 	def getMove(self, name):
 		""" finds a move known by the branch via its name """
-		for move in self.allMoves:
-			if move.name==name: return move
-		return None
+		return self.allMoves.get(name)
 
 	## log
 	## --------------------------------------------------------------------
@@ -41,10 +38,13 @@ class Component(object):
 	## logStrategies
 	## --------------------------------------------------------------------
 	def logStrategies(self):
-		""" adds strategies of this component to the logger """
+		""" adds strategies of this component (and the counters of its memo) to the logger """
 		moves = {}
 		for move in self.allMoves:
 			moves[move.name] = move.write()	
 		self.aps.log.add("strategies", self.name, moves)
+		## the memo counters of the whole run
+		if self.memo is not None:
+			self.log("after", "memo", {"hits": self.memo.hits, "misses": self.memo.misses, "entries": len(self.memo)})
 
 
@@ -1,5 +1,15 @@
 
 
+## strategyKey
+## ------------------------------------------------------------------------
+def strategyKey(strategy):
+	""" returns the key of a strategy together with its type, None if there is no strategy """
+	if strategy is None: return None
+	return (type(strategy).__name__, strategy.key())
+
+
+
+
 ## Condition
 ## ========================================================================
 class Condition:
@@ -46,6 +56,12 @@ class Condition:
 		""" dumps the content of this object to screen (for debugging) """
 		return "Condition (%s, %s, %s, %s, %s)"%(self.name, self.config.name, self.prev.name if self.prev else None, self.strategy.name, "pos" if self.isPos else "neg")
 
+	## key
+	## --------------------------------------------------------------------
+	def key(self):
+		""" returns the hashable key of the situation this condition applies to (config, previous strategy, strategy), isPos is not part of it """
+		return (self.config.key(), strategyKey(self.prev), strategyKey(self.strategy))
+
 	## read
 	## --------------------------------------------------------------------
 	def read(self, d):
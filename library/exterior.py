@@ -1,24 +1,96 @@
-import copy
-import math
+import numpy as np
+import random
 
 
+## buildCounts
+## ------------------------------------------------------------------------
+def buildCounts(slots, numSlots):
+	""" builds the vector of the number of objects held by a collection of slots (-1 if slot not present), indexed by slot id """
+	counts = np.full(numSlots, -1)
+	for slot in slots:
+		counts[slot.id] = len(slot.holds)
+	return counts
+
+## buildScores
+## ------------------------------------------------------------------------
+def buildScores(weights, counts):
+	""" builds the score vector (score of the slot times number of objects held, NaN if slot not present), indexed by slot id """
+	return np.where(counts>=0, weights*counts, np.nan)
+
+## buildSums
+## ------------------------------------------------------------------------
+def buildSums(slots, values, numSlots):
+	""" builds the per-property sums of the values of the objects held by a collection of slots, indexed by slot id """
+	sums = np.zeros((numSlots, values.shape[1]))
+	for slot in slots:
+		sums[slot.id] = sumHolds(slot.holds, values)
+	return sums
+
+## buildStateKey
+## ------------------------------------------------------------------------
+def buildStateKey(slots, numSlots):
+	""" builds the StateKey of a collection of slots, unordered slots are canonicalized by sorting """
+	holds = [None]*numSlots
+	pos   = [None]*numSlots
+	for slot in slots:
+		ids = [x.id for x in slot.holds]
+		holds[slot.id] = tuple(ids if slot.type.ordered==1 else sorted(ids))
+		if slot.slot: pos[slot.id] = slot.slot.id
+	return StateKey(tuple(holds), tuple(pos))
+
 ## copyTaskData
 ## ------------------------------------------------------------------------
-def copyTaskData(fr, to):
-	""" copies the data from one task (from) to another (to) """
-	attributes = ("slotTypes", "objectTypes", "objects", "actions", "handles", "initial", "current", "final")
-	for attrib in attributes:
-		items = [x.copy() for x in getattr(fr, attrib)]
+def copyTaskData(fr, to, ids=None, objIds=None):
+	""" copies the data from one task (from) to another (to), optionally projected onto a set of slot ids;
+	    a projection only copies the objects held by these slots (in any state), and the ones with the given ids """
+	## the static data is shared
+	for attrib in ("slotTypes", "objectTypes", "actions", "handles"):
+		setattr(to, attrib, getattr(fr, attrib))
+	## the dynamic data is copied
+	for attrib in ("initial", "current", "final"):
+		items = [x.copy() for x in getattr(fr, attrib) if ids is None or x.id in ids]
 		for item in items: item.task = to
 		setattr(to, attrib, items)
+	if ids is not None:
+		objIds = set(objIds) if objIds else set()
+		for attrib in ("initial", "current", "final"):
+			for slot in getattr(to, attrib): objIds.update(x.id for x in slot.holds)
+	to.objects = [x.copy() for x in fr.objects if ids is None or x.id in objIds]
+	for item in to.objects: item.task = to
+	## the symbol table is shared, the index is rebuilt for the new items
+	to.symbols     = fr.symbols
+	to.rules       = fr.rules
+	to.weights     = fr.weights
+	to.values      = fr.values
+	to.constraints = fr.constraints
+	to.buildIndex()
+	## the copied items refer to each other, not to the items of the source task
+	## (a channel positioned at a slot outside the projection keeps referring to it, only its id is used)
+	objects = to.index["objects"]
+	slots   = to.index["current"]
+	for attrib in ("initial", "current", "final"):
+		for slot in getattr(to, attrib):
+			slot.holds = [objects[x.id] for x in slot.holds]
+			if slot.slot: slot.slot = slots[slot.slot.id] or slot.slot
+	for obj in to.objects:
+		obj.slot = slots[obj.slot.id] if obj.slot else None
+	if ids is None: to.stateHash, to.typeHashes = fr.stateHash, fr.typeHashes[:]
+	else          : to.rehash()
+	## the journal of the target refers to items that have just been replaced
+	to.clearJournal()
+
+## couples
+## ------------------------------------------------------------------------
+def couples(end, slot):
+	""" checks if the end (initial or final, given as slot or slot type) of a handle can couple to a slot """
+	if end.stype=="slot": return end == slot
+	return end == slot.type
 
 ## createTask
 ## ------------------------------------------------------------------------
 def createTask(aps, name):
-	""" creates a task instance including its before component """
-	task        = Task(aps, name            )
-	task.before = Task(aps, "%s_before"%name)
-	return task
+	""" creates a task instance """
+	return Task(aps, name)
 
 ## getItem
 ## ------------------------------------------------------------------------
@@ -30,12 +102,15 @@ def getItem(container, name):
 
 ## metric
 ## ------------------------------------------------------------------------
-def metric(config):
-	""" computes the metric (score) of a configuration as the squared sum of all scores """
-	score = 0
-	for slot in config:
-		score += math.pow(slot.score * len(slot.holds), 2)
-	return math.sqrt(score)
+def metric(scores):
+	""" computes the metric (score) of a score vector as the squared sum of all scores """
+	return float(np.sqrt(np.sum(np.square(scores))))
+
+## sumHolds
+## ------------------------------------------------------------------------
+def sumHolds(objs, values):
+	""" sums the values of all properties over a list of objects """
+	return values[[x.id for x in objs]].sum(axis=0)
 
 ## storeVals
 ## ------------------------------------------------------------------------
@@ -44,7 +119,7 @@ def storeVals(item, entry, keys=[]):
 	if len(keys)==0: keys = list(entry.keys())
 	for key in keys:
 		if key not in entry: continue
-		setattr(item, key, entry[key])
+		item.store(key, entry[key])
 
 
 
@@ -53,6 +128,7 @@ def storeVals(item, entry, keys=[]):
 ## ========================================================================
 class Item:
 	""" item to hold info from json file """
+	__slots__ = ("task", "stype", "name", "id", "isMovable")
 
 	## __init__
 	## --------------------------------------------------------------------
@@ -61,13 +137,14 @@ class Item:
 		self.task      = task
 		self.stype     = stype
 		self.name      = name
+		self.id        = None
 		self.isMovable = False
 
 	## __eq__
 	## --------------------------------------------------------------------
 	def __eq__(self, other):
 		""" test if two items are identical """
-		return self.stype==other.stype and self.name==other.name
+		return self.stype==other.stype and self.id==other.id
 
 	## __neq__
 	## --------------------------------------------------------------------
@@ -78,10 +155,199 @@ class Item:
 	## copy
 	## --------------------------------------------------------------------
 	def copy(self):
-		""" creates a copy of this item """
-		item = Item(self.task, self.stype, self.name)
-		for k,v in vars(self).items():
-			setattr(item, k, copy.copy(v)) #v[:] if type(v)==list else v)
+		""" creates a copy of this item (of the same class), sharing the common fields """
+		item           = self.__class__.__new__(self.__class__)
+		item.task      = self.task
+		item.stype     = self.stype
+		item.name      = self.name
+		item.id        = self.id
+		item.isMovable = self.isMovable
+		return item
+
+	## store
+	## --------------------------------------------------------------------
+	def store(self, key, value):
+		""" sets a field of this item by name, raises a ValueError if the item has no such field """
+		if not any(key in getattr(x, "__slots__", ()) for x in type(self).__mro__):
+			raise ValueError("%s %s has no parameter %s"%(type(self).__name__, self.name, key))
+		setattr(self, key, value)
+
+
+
+
+## Handle
+## ========================================================================
+class Handle(Item):
+	""" a handle, i.e. a way to move an object or a slot from an initial to a final slot """
+	__slots__ = ("type", "modulate", "initial", "final")
+
+	## __init__
+	## --------------------------------------------------------------------
+	def __init__(self, task, name):
+		""" constructor """
+		super(Handle, self).__init__(task, "handle", name)
+		self.type     = None
+		self.modulate = None ## "object" or the name of the slot that is moved
+		self.initial  = None ## slot or slot type the handle couples to initially
+		self.final    = None ## slot or slot type the handle couples to finally
+
+	## copy
+	## --------------------------------------------------------------------
+	def copy(self):
+		""" creates a copy of this handle (all fields are static and shared) """
+		item          = super(Handle, self).copy()
+		item.type     = self.type
+		item.modulate = self.modulate
+		item.initial  = self.initial
+		item.final    = self.final
+		return item
+
+
+
+
+## Object
+## ========================================================================
+class Object(Item):
+	""" an object that is held by slots, its properties (as defined by its type) are accessible as attributes """
+	__slots__ = ("type", "slot", "props")
+
+	## __init__
+	## --------------------------------------------------------------------
+	def __init__(self, task, name):
+		""" constructor """
+		super(Object, self).__init__(task, "object", name)
+		self.isMovable = True
+		self.type      = None
+		self.slot      = None ## slot the object is held by
+		self.props     = {}   ## values of the properties of the object type
+
+	## __getattr__
+	## --------------------------------------------------------------------
+	def __getattr__(self, name):
+		""" returns the value of a property of the object (only called if there is no such field) """
+		if name=="props" or name not in self.props: raise AttributeError(name)
+		return self.props[name]
+
+	## copy
+	## --------------------------------------------------------------------
+	def copy(self):
+		""" creates a copy of this object, only the slot is dynamic, type and properties are shared """
+		item       = super(Object, self).copy()
+		item.type  = self.type
+		item.slot  = self.slot
+		item.props = self.props
+		return item
+
+	## store
+	## --------------------------------------------------------------------
+	def store(self, key, value):
+		""" sets a field or a property of this object by name (the properties are replaced, as they may be shared) """
+		if key in Object.__slots__ or key in Item.__slots__: 
+			setattr(self, key, value)
+			return
+		self.props = dict(self.props)
+		self.props[key] = value
+
+
+
+
+## ObjectType
+## ========================================================================
+class ObjectType(Item):
+	""" the type of an object, defining the properties objects of that type have """
+	__slots__ = ("properties",)
+
+	## __init__
+	## --------------------------------------------------------------------
+	def __init__(self, task, name):
+		""" constructor """
+		super(ObjectType, self).__init__(task, "objectType", name)
+		self.properties = []
+
+	## copy
+	## --------------------------------------------------------------------
+	def copy(self):
+		""" creates a copy of this object type (all fields are static and shared) """
+		item            = super(ObjectType, self).copy()
+		item.properties = self.properties
+		return item
+
+
+
+
+## Slot
+## ========================================================================
+class Slot(Item):
+	""" a slot holding objects, movable slots (channels) are positioned at another slot """
+	__slots__ = ("type", "holds", "score", "numberOfLayers", "gradientAsc", "gradientDesc", "noNegSum", "noPosSum", "pos", "bound", "slot")
+
+	## __init__
+	## --------------------------------------------------------------------
+	def __init__(self, task, name):
+		""" constructor """
+		super(Slot, self).__init__(task, "slot", name)
+		self.type           = None
+		self.holds          = [] ## objects held by the slot (bottom to top)
+		self.score          = 0
+		self.numberOfLayers = 0
+		self.gradientAsc    = []
+		self.gradientDesc   = []
+		self.noNegSum       = []
+		self.noPosSum       = []
+		self.pos            = None ## slot the slot is located at
+		self.bound          = []   ## slots a movable slot can be positioned at
+		self.slot           = None ## slot a movable slot is currently positioned at
+
+	## copy
+	## --------------------------------------------------------------------
+	def copy(self):
+		""" creates a copy of this slot, only holds and the position are dynamic, all other fields are shared """
+		item                = super(Slot, self).copy()
+		item.type           = self.type
+		item.holds          = self.holds[:]
+		item.score          = self.score
+		item.numberOfLayers = self.numberOfLayers
+		item.gradientAsc    = self.gradientAsc
+		item.gradientDesc   = self.gradientDesc
+		item.noNegSum       = self.noNegSum
+		item.noPosSum       = self.noPosSum
+		item.pos            = self.pos
+		item.bound          = self.bound
+		item.slot           = self.slot
+		return item
+
+
+
+
+## SlotType
+## ========================================================================
+class SlotType(Item):
+	""" the type of a slot, defining its default constraints """
+	__slots__ = ("numberOfLayers", "ordered", "gradientAsc", "gradientDesc", "noNegSum", "noPosSum")
+
+	## __init__
+	## --------------------------------------------------------------------
+	def __init__(self, task, name):
+		""" constructor """
+		super(SlotType, self).__init__(task, "slotType", name)
+		self.numberOfLayers = 0
+		self.ordered        = 0
+		self.gradientAsc    = []
+		self.gradientDesc   = []
+		self.noNegSum       = []
+		self.noPosSum       = []
+
+	## copy
+	## --------------------------------------------------------------------
+	def copy(self):
+		""" creates a copy of this slot type (all fields are static and shared) """
+		item                = super(SlotType, self).copy()
+		item.numberOfLayers = self.numberOfLayers
+		item.ordered        = self.ordered
+		item.gradientAsc    = self.gradientAsc
+		item.gradientDesc   = self.gradientDesc
+		item.noNegSum       = self.noNegSum
+		item.noPosSum       = self.noPosSum
 		return item
 
 
@@ -96,10 +362,12 @@ class Config:
 	## --------------------------------------------------------------------
 	def __init__(self, task, name=None, slots=None, fromDict=None, fromTask=None, fromTriangle=None):
 		""" constructor """
-		self.aps   = task.aps
-		self.task  = task
-		self.name  = name
-		self.slots = slots
+		self.aps    = task.aps
+		self.task   = task
+		self.name   = name
+		self.live   = False ## True if the slots are references to the items of a task (then nothing is cached)
+		self.layout = None  ## per slot id: tuple of ids of the objects held (in order), slots are built from it on demand
+		self.slots  = slots
 		if fromDict    : self.read        (fromDict)
 		if fromTask    : self.fromTask    (fromTask)
 		if fromTriangle: self.fromTriangle(fromTriangle)
@@ -108,7 +376,13 @@ class Config:
 	## --------------------------------------------------------------------
 	def __eq__(self, other):
 		""" tests if this Config object is the same as another Config object """
-		return self.show() == other.show()
+		return self.key() == other.key()
+
+	## __hash__
+	## --------------------------------------------------------------------
+	def __hash__(self):
+		""" returns the hash of the canonical form of this Config object """
+		return hash(self.key())
 
 	## __neq__
 	## --------------------------------------------------------------------
@@ -116,15 +390,26 @@ class Config:
 		""" tests if this Config object is not the same as another Config object """
 		return not self==other
 
+	## copy
+	## --------------------------------------------------------------------
+	def copy(self, name=None):
+		""" builds a copy of this configuration (e.g. to rename it), sharing the parts that are never modified """
+		config        = Config(self.task, name if name else self.name, self.items[:] if self.layout is None and self.items is not None else None)
+		config.live   = self.live
+		config.layout = self.layout
+		config.state  = self.state
+		config.scores = self.scores
+		config.custom = dict(self.custom)
+		return config
+
 	## distance
 	## --------------------------------------------------------------------
 	def distance(self, other):
 		""" computes the metric distance between two Config objects, accounting for different slots in these configs """
-		onames = [x.name for x in other.slots]
-		snames = [x.name for x in self .slots if x.name in onames]
-		sub1   = [x for x in self .slots if x.name in snames]
-		sub2   = [x for x in other.slots if x.name in snames]
-		return metric(sub1) - metric(sub2)
+		mine   = self .vector()
+		theirs = other.vector()
+		common = ~(np.isnan(mine) | np.isnan(theirs))
+		return metric(mine[common]) - metric(theirs[common])
 
 	## dump
 	## --------------------------------------------------------------------
@@ -143,12 +428,17 @@ class Config:
 	## fromTask
 	## --------------------------------------------------------------------
 	def fromTask(self, collection="current"):
-		""" fill the Config object from an existing task (do hard copy!) """
+		""" fill the Config object from an existing task (only the ids are kept, slots are built on demand) """
 		if collection not in ("initial", "current", "final"): return
-		self.name  = "%s_%s"%(self.task.name, collection)
-		self.slots = []
-		for slot in getattr(self.task, collection):
-			self.slots.append(slot.copy())
+		slots       = getattr(self.task, collection)
+		self.name   = "%s_%s"%(self.task.name, collection)
+		self.slots  = None
+		layout      = [None]*self.task.symbols.size("slot")
+		for slot in slots:
+			layout[slot.id] = tuple(x.id for x in slot.holds)
+		self.layout = tuple(layout)
+		self.state  = self.task.stateKey(collection)
+		self.scores = self.task.scoreVector(collection)
 
 	## fromTriangle
 	## --------------------------------------------------------------------
@@ -156,6 +446,37 @@ class Config:
 		""" fill the Config object from an existing triangle (this is NOT a hard copy!) """
 		self.name  = "%s_%s"%(triangle.name, "config")
 		self.slots = triangle.slots[:]
+		self.live  = True
+
+	## key
+	## --------------------------------------------------------------------
+	def key(self):
+		""" returns the StateKey of this configuration (the canonical form, computed once) """
+		if self.state: return self.state
+		state = buildStateKey(self.slots, self.task.symbols.size("slot"))
+		if not self.live: self.state = state
+		return state
+
+	## keyCustom
+	## --------------------------------------------------------------------
+	def keyCustom(self, stypes=["pin",]):
+		""" returns the hashable form of showCustom, i.e. configs are equalCustom if their keys are equal """
+		return tuple((name, tuple(holds)) for name, holds in self.showCustom(stypes))
+
+	## materialize
+	## --------------------------------------------------------------------
+	def materialize(self):
+		""" builds the slots of this configuration from its layout, using the items of the symbol table """
+		slots   = []
+		symbols = self.task.symbols.items
+		for sid,holds in enumerate(self.layout):
+			if holds is None: continue
+			slot       = symbols["slot"][sid].copy()
+			slot.task  = self.task
+			slot.holds = [symbols["object"][x] for x in holds]
+			slot.slot  = symbols["slot"][self.state.slots[sid]] if self.state.slots[sid] is not None else None
+			slots.append(slot)
+		return slots
 
 	## read
 	## --------------------------------------------------------------------
@@ -165,18 +486,18 @@ class Config:
 		self.name  = d["name"]
 		## slots
 		self.slots = []
+		slots      = []
 		for sraw in d["slots"]:
 			## find slot
 			s = self.task.getSlot(sraw[0])
 			if not s: 
-				self.slots = []
 				## FIXME: better to throw a runtime error here!
 				return
 			slot = s.copy()
 			slot.holds = []
-			self.slots.append(slot)
+			slots.append(slot)
 			## add slot for channels
-			if slot.type.name=="channel": 
+			if slot.type.name=="channel":
 				slot.slot = None
 				s = self.task.getSlot(sraw[1])
 				if s: slot.slot = s.copy()
@@ -187,6 +508,7 @@ class Config:
 				## FIXME: and here!
 				if not o: continue
 				slot.holds.append(o.copy())
+		self.slots = slots
 
 	## show
 	## --------------------------------------------------------------------
@@ -195,20 +517,55 @@ class Config:
 		slots = []
 		for slot in sorted(self.slots, key=lambda x: x.name):
 			holds = [o.name for o in slot.holds]
-			slots.extend([[slot.name, slot.slot.name if hasattr(slot, "slot") else None, holds if slot.type.ordered==1 else sorted(holds)]])
+			slots.extend([[slot.name, slot.slot.name if slot.slot else None, holds if slot.type.ordered==1 else sorted(holds)]])
 		return slots
 
 	## showCustom
 	## --------------------------------------------------------------------
 	def showCustom(self, stypes=["pin",]):
-		""" collect and display the contents of this configuration, customizable slot types, no channel slots """
+		""" collect and display the contents of this configuration, customizable slot types, no channel slots (computed once per set of slot types) """
+		if tuple(stypes) in self.custom: return self.custom[tuple(stypes)]
 		slots = []
 		for slot in sorted(self.slots, key=lambda x: x.name):
 			if len(stypes)>0 and slot.type.name not in stypes: continue
 			holds = [o.name for o in slot.holds]
 			slots.extend([[slot.name, holds if slot.type.ordered==1 else sorted(holds)]])
+		if not self.live: self.custom[tuple(stypes)] = slots
 		return slots
 
+	## slots
+	## --------------------------------------------------------------------
+	@property
+	def slots(self):
+		""" returns the slots of this configuration, building them from the layout if needed """
+		if self.items is None and self.layout is not None: self.items = self.materialize()
+		return self.items
+
+	@slots.setter
+	def slots(self, slots):
+		""" sets the slots of this configuration and invalidates everything cached """
+		self.items  = slots
+		self.layout = None ## ids of the objects held (the slots are given now)
+		self.state  = None ## canonical form (StateKey)
+		self.scores = None ## score vector
+		self.custom = {}   ## results of showCustom, per tuple of slot types
+
+	## slotIds
+	## --------------------------------------------------------------------
+	def slotIds(self):
+		""" returns the ids of the slots of this configuration (so it can be applied like a triangle) """
+		if self.layout is not None: return frozenset(i for i,x in enumerate(self.layout) if x is not None)
+		return frozenset(x.id for x in self.slots)
+
+	## vector
+	## --------------------------------------------------------------------
+	def vector(self):
+		""" returns the score vector of this configuration (computed once) """
+		if self.scores is not None: return self.scores
+		scores = buildScores(self.task.weights, buildCounts(self.slots, self.task.symbols.size("slot")))
+		if not self.live: self.scores = scores
+		return scores
+
 	## write
 	## --------------------------------------------------------------------
 	def write(self):
@@ -218,6 +575,121 @@ class Config:
 
 
 
+## StateKey
+## ========================================================================
+class StateKey:
+	""" compact, immutable and hashable representation of the state of a task, indexed by slot id """
+	__slots__ = ("holds", "slots", "hash")
+
+	## __init__
+	## --------------------------------------------------------------------
+	def __init__(self, holds, slots):
+		""" constructor """
+		self.holds = holds ## per slot id: tuple of ids of the objects held (canonical order), None if slot not present
+		self.slots = slots ## per slot id: id of the slot a movable slot is positioned at, None otherwise
+		self.hash  = hash((holds, slots))
+
+	## __eq__
+	## --------------------------------------------------------------------
+	def __eq__(self, other):
+		""" tests if this StateKey object is the same as another StateKey object """
+		return self.hash==other.hash and self.holds==other.holds and self.slots==other.slots
+
+	## __hash__
+	## --------------------------------------------------------------------
+	def __hash__(self):
+		""" returns the (precomputed) hash """
+		return self.hash
+
+	## __neq__
+	## --------------------------------------------------------------------
+	def __neq__(self, other):
+		""" tests if this StateKey object is not the same as another StateKey object """
+		return not self==other
+
+
+
+
+## SymbolTable
+## ========================================================================
+class SymbolTable:
+	""" per-problem table giving every slot, object, handle and type a dense integer id """
+
+	## collections of a task and the kind of items they hold
+	kinds = {"slotTypes": "slotType", "objectTypes": "objectType", "objects": "object", "handles": "handle", "initial": "slot", "current": "slot", "final": "slot"}
+
+	## __init__
+	## --------------------------------------------------------------------
+	def __init__(self):
+		""" constructor """
+		self.ids   = {}   ## name -> id, per kind
+		self.items = {}   ## id -> item (of the task that has been loaded), per kind
+		self.holds   = None ## random keys of the state hash for an object held by a slot: [slot id][object id][layer]
+		self.pos     = None ## random keys of the state hash for a movable slot positioned at a slot: [movable id][slot id]
+		self.present = None ## random keys of the state hash for a slot present in the task (projections differ): [slot id]
+
+	## add
+	## --------------------------------------------------------------------
+	def add(self, item):
+		""" registers an item and assigns the next free id of its kind to it """
+		ids     = self.ids  .setdefault(item.stype, {})
+		items   = self.items.setdefault(item.stype, [])
+		item.id = len(items)
+		ids[item.name] = item.id
+		items.append(item)
+
+	## buildZobrist
+	## --------------------------------------------------------------------
+	def buildZobrist(self, seed=0):
+		""" draws the random 64-bit keys of the state hash (own generator, the simulation's random stream is not touched) """
+		rng        = random.Random(seed)
+		numObjects = self.size("object")
+		numSlots   = self.size("slot")
+		self.holds = []
+		for slot in self.items["slot"]:
+			## unordered slots share a single layer, the order of what they hold does not matter
+			numLayers = numObjects if slot.type.ordered==1 else 1
+			self.holds.append([[rng.getrandbits(64) for i in range(numLayers)] for j in range(numObjects)])
+		self.pos     = [[rng.getrandbits(64) for i in range(numSlots)] for j in range(numSlots)]
+		self.present = [rng.getrandbits(64) for j in range(numSlots)]
+
+	## getId
+	## --------------------------------------------------------------------
+	def getId(self, kind, name):
+		""" returns the id of an item by kind and name """
+		if kind not in self.ids: return None
+		return self.ids[kind].get(name)
+
+	## holdKey
+	## --------------------------------------------------------------------
+	def holdKey(self, slot, obj, layer):
+		""" returns the key of the state hash for an object held by a slot at a given layer """
+		keys = self.holds[slot.id][obj.id]
+		return keys[layer] if len(keys)>1 else keys[0]
+
+	## posKey
+	## --------------------------------------------------------------------
+	def posKey(self, movable, slot):
+		""" returns the key of the state hash for a movable slot positioned at a slot """
+		if not slot: return 0
+		return self.pos[movable.id][slot.id]
+
+	## presentKey
+	## --------------------------------------------------------------------
+	def presentKey(self, slot):
+		""" returns the key of the state hash for a slot being present """
+		return self.present[slot.id]
+
+	## size
+	## --------------------------------------------------------------------
+	def size(self, kind):
+		""" returns the number of items of a given kind """
+		if kind not in self.items: return 0
+		return len(self.items[kind])
+
+
+
+
 ## Task
 ## ========================================================================
 class Task:
@@ -237,7 +709,22 @@ class Task:
 		self.initial      = []
 		self.current      = []
 		self.final        = []
-		self.before       = None
+		self.symbols      = None  ## symbol table of the problem (shared by all copies)
+		self.index        = None  ## id -> item, per collection (None until the task is loaded)
+		self.rules        = None  ## per handle id: (slotin id, slotout id) -> static requirements of the move (shared by all copies)
+		self.key          = None  ## StateKey of the current state (None if it needs to be derived again)
+		self.configs      = {}    ## Configs per collection, kept until the state changes (shared, never to be modified)
+		self.weights      = None  ## per slot id: score of the slot (shared by all copies)
+		self.counts       = None  ## per slot id: number of objects held in the current state (None if it needs to be derived again)
+		self.values       = None  ## per object id: values of the constrained properties (shared by all copies)
+		self.constraints  = None  ## per slot id: indices of the properties constrained by gradientAsc, gradientDesc, noNegSum, noPosSum (shared by all copies)
+		self.sums         = None  ## per slot id: running sums of the constrained properties in the current state (None if it needs to be derived again)
+		self.journal      = []    ## recorded mutations (item, attribute, previous value) since the oldest open savepoint
+		self.savepoints   = []    ## open savepoints as (id, position in the journal, state hash, hashes per slot type)
+		self.stateHash    = None  ## rolling 64-bit (Zobrist) hash of the current state, updated as items are moved
+		self.typeHashes   = None  ## per slot type id: the same hash, restricted to the slots of that type
+		self.numSps       = 0     ## number of savepoints ever opened (used as id)
+		self.lastMove     = None  ## savepoint opened by the last call of apply (used by revert)
 
 
 
@@ -259,7 +746,7 @@ class Task:
 	## --------------------------------------------------------------------
 	def getHandle(self, name):
 		""" returns a handle item by name """
-		return getItem(self.handles, name)
+		return self.lookup("handles", name)
 
 	## getItem
 	## --------------------------------------------------------------------
@@ -285,10 +772,11 @@ class Task:
 	## --------------------------------------------------------------------
 	def getMovables(self, itemType=None):
 		""" returns all movable items (objects and slots) by type """
-		if itemType in [x.name for x in self.current    ]: 
-			if self.getItem(itemType).isMovable: return [self.getSlot(itemType)]
+		slot = self.getSlot(itemType) if itemType else None
+		if slot: 
+			if slot.isMovable: return [slot]
 			return []
-		if itemType in [x.name for x in self.objectTypes]: 
+		if itemType and self.getObjectType(itemType): 
 			return [x for x in self.objects if x.stype==itemType]
 		return self.objects + [x for x in self.current if x.isMovable]
 
@@ -296,19 +784,19 @@ class Task:
 	## --------------------------------------------------------------------
 	def getObject(self, name):
 		""" returns an object item by name """
-		return getItem(self.objects    , name)
+		return self.lookup("objects", name)
 
 	## getObjectType
 	## --------------------------------------------------------------------
 	def getObjectType(self, name):
 		""" returns and object type item by name """
-		return getItem(self.objectTypes, name)
+		return self.lookup("objectTypes", name)
 
 	## getSlot
 	## --------------------------------------------------------------------
 	def getSlot(self, name, collection="current"):
 		""" returns a slot item by name """
-		return getItem(getattr(self, collection), name)
+		return self.lookup(collection, name)
 
 	## getSlots
 	## --------------------------------------------------------------------
@@ -324,7 +812,16 @@ class Task:
 	## --------------------------------------------------------------------
 	def getSlotType(self, name):
 		""" returns a slot type item by name """
-		return getItem(self.slotTypes  , name)
+		return self.lookup("slotTypes", name)
+
+	## lookup
+	## --------------------------------------------------------------------
+	def lookup(self, collection, name):
+		""" returns an item of a collection by name, O(1) through the symbol table once the task is loaded """
+		if not self.index: return getItem(getattr(self, collection), name)
+		i = self.symbols.getId(SymbolTable.kinds[collection], name)
+		if i is None: return None
+		return self.index[collection][i]
 
 
 
@@ -333,14 +830,16 @@ class Task:
 	## apply
 	## --------------------------------------------------------------------
 	def apply(self, handle, slotin, movable, slotout):
-		""" applies a handle to the current problem space """
+		""" applies a handle to the current problem space; the move is kept under a savepoint until the next call, so that revert can undo it
+		    (reverting it also closes all savepoints opened after the move, which then cannot be rolled back or released anymore) """
 		## sanity check
 		if not handle or not slotin or not movable or not slotout: return False
-		## book-keep in case of revert
-		copyTaskData(self, self.before)
+		## book-keep in case of revert (only the last move can be reverted)
+		if self.lastMove: self.release(self.lastMove)
+		self.lastMove = self.savepoint()
 		## carry out the action
-		if handle.modulate=="object"                        : return self.applyObject(handle, slotin, movable, slotout)
-		if handle.modulate in [x.name for x in self.current]: return self.applySlot  (handle, slotin, movable, slotout)
+		if handle.modulate=="object"     : return self.applyObject(handle, slotin, movable, slotout)
+		if self.getSlot(handle.modulate): return self.applySlot  (handle, slotin, movable, slotout)
 		## nothing done
 		return False
 
@@ -348,75 +847,33 @@ class Task:
 	## --------------------------------------------------------------------
 	def applyObject(self, handle, slotin, obj, slotout):
 		""" applies a handle to the current problem space """
-		## check if output slot is of proper type
-		if slotout.type.name == "pos": return False
-		## check if the output slot can take another object or is full already
-		if slotout.numberOfLayers <= len(slotout.holds): return False
-		## check if handle can couple to that output slot
-		if handle.final.stype=="slot":
-			if handle.final != slotout     : return False
-		else:
-			if handle.final != slotout.type: return False
-		## check if output slot has constraints
-		if len(slotout.gradientAsc )>0 and len(slotout.holds)>0:
-			for prop in slotout.gradientAsc:
-				if getattr(slotout.holds[-1], prop) >= getattr(obj, prop): return False
-		if len(slotout.gradientDesc)>0 and len(slotout.holds)>0:
-			for prop in slotout.gradientDesc:
-				if getattr(slotout.holds[-1], prop) <= getattr(obj, prop): return False
-		if slotout.noNegSum and len(slotout.holds)>0:
-			for prop in slotout.noNegSum:
-				if sum(getattr(x, prop) for x in slotout.holds) + getattr(obj, prop) < 0: return False
-		if slotout.noPosSum and len(slotout.holds)>0:
-			for prop in slotout.noPosSum:
-				if sum(getattr(x, prop) for x in slotout.holds) + getattr(obj, prop) > 0: return False
-		## find the current place of the object
-		myslot = self.findSlot(obj)
-		if not myslot: return False
-		## check if the slot of the object is the same as the input slot
-		if slotin != myslot: return False
-		## check if handle can couple to that input slot
-		if handle.initial.stype=="slot":
-			if handle.initial != myslot     : return False
-		else: 
-			if handle.initial != myslot.type: return False
-		## check if input slot has constraints (gradient constraints already checked through slotout)
-		if slotin.noNegSum and len(slotin.holds)>0:
-			for prop in slotin.noNegSum:
-				if sum(getattr(x, prop) for x in slotin.holds if x!=obj) < 0: return False
-		if slotin.noPosSum and len(slotin.holds)>0:
-			for prop in slotin.noPosSum:
-				if sum(getattr(x, prop) for x in slotin.holds if x!=obj) > 0: return False
-		## check if object is on the the top-most layer of the slot
-		if myslot.type.ordered==1 and myslot.holds.index(obj)+1 != len(myslot.holds): return False
-		## check position of the output slot in case it is the hand
-		if slotout.type.name=="channel" and slotout.slot != slotin .pos: return False
-		if slotin .type.name=="channel" and slotin .slot != slotout.pos: return False
+		if not self.checkObject(handle, slotin, obj, slotout): return False
 		## execute the handle (= place the object on the new slot and update the state)
+		self.record(slotout, "holds")
+		self.record(slotin , "holds")
+		self.record(obj    , "slot" )
+		self.toggle(slotin , self.symbols.holdKey(slotin , obj, len(slotin .holds)-1))
+		self.toggle(slotout, self.symbols.holdKey(slotout, obj, len(slotout.holds)  ))
 		slotout.holds.append(obj)
 		slotin .holds.remove(obj)
 		obj.slot = slotout
+		## the counts and sums are updated in place
+		if self.counts is not None:
+			self.counts[slotout.id] += 1
+			self.counts[slotin .id] -= 1
+		if self.sums is not None:
+			self.sums[slotout.id] += self.values[obj.id]
+			self.sums[slotin .id] -= self.values[obj.id]
 		return True
 
 	## applySlot
 	## --------------------------------------------------------------------
 	def applySlot(self, handle, slotin, movable, slotout):
 		""" applies a handle to the current problem space """
-		## check if handle can couple to slots
-		if handle.initial.name!="pos": return False
-		if handle.final  .name!="pos": return False
-		## check if output slot is of proper type
-		if slotout.type.name != "pos": return False
-		## check if movable can move to that output slot
-		if slotout not in movable.bound: return False
-		## find the current slot of the movable
-		myslot = movable.slot
-		if not myslot: return False
-		## check if movable is on a good input slot
-		if myslot.type.name != "pos": return False
-		## check if movable is on the required input slot
-		if myslot.name != slotin.name: return False
+		if not self.checkSlot(handle, slotin, movable, slotout): return False
 		## execute the handle (= place the movable on the new slot and update the state)
+		self.record(movable, "slot")
+		self.toggle(movable, self.symbols.posKey(movable, movable.slot) ^ self.symbols.posKey(movable, slotout))
 		movable.slot = slotout
 		return True
 
@@ -425,19 +882,197 @@ class Task:
 	def applyTriangle(self, triangle):
 		""" applies a triangle to the current problem space """
 		## check if triangle is empty
-		if not triangle or len(triangle.slots)==0: return
+		ids = triangle.slotIds() if triangle else None
+		if not ids: return
 		## clear everything outside the given triangle
 		for v in ["initial", "final", "current"]:
-			for i,slot in enumerate(getattr(self, v)):
-				if slot in triangle.slots: continue
-				getattr(self, v).remove(slot)
-				del(slot)
+			setattr(self, v, [x for x in getattr(self, v) if x.id in ids])
+		self.buildIndex()
+		self.rehash()
+		self.key     = None
+		self.configs = {}
+		self.counts = None
+		self.sums   = None
+
+	## assign
+	## --------------------------------------------------------------------
+	def assign(self, slot, objs):
+		""" lets a slot hold a given list of objects, nothing is done (or recorded) if it holds exactly these already """
+		if len(slot.holds)==len(objs) and all(x is y for x,y in zip(slot.holds, objs)) and all(x.slot is slot for x in objs): return
+		self.record(slot, "holds")
+		for layer,obj in enumerate(slot.holds): self.toggle(slot, self.symbols.holdKey(slot, obj, layer))
+		for layer,obj in enumerate(objs      ): self.toggle(slot, self.symbols.holdKey(slot, obj, layer))
+		slot.holds = objs
+		for obj in objs:
+			if obj.slot is slot: continue
+			self.record(obj, "slot")
+			obj.slot = slot
+		self.tally(slot)
+
+	## assignPos
+	## --------------------------------------------------------------------
+	def assignPos(self, movable, slot):
+		""" positions a movable slot at a given slot, nothing is done (or recorded) if it is there already """
+		if movable.slot is slot: return
+		self.record(movable, "slot")
+		if movable.isMovable: self.toggle(movable, self.symbols.posKey(movable, movable.slot) ^ self.symbols.posKey(movable, slot))
+		movable.slot = slot
+
+	## buildIndex
+	## --------------------------------------------------------------------
+	def buildIndex(self):
+		""" (re)builds the id -> item maps of all collections of this task """
+		if not self.symbols: return
+		self.index = {}
+		for collection,kind in SymbolTable.kinds.items():
+			items = [None]*self.symbols.size(kind)
+			for item in getattr(self, collection): items[item.id] = item
+			self.index[collection] = items
+
+	## clearJournal
+	## --------------------------------------------------------------------
+	def clearJournal(self):
+		""" forgets all recorded mutations, e.g. after the items of the task have been replaced; open savepoints are re-anchored
+		    at the current state (rolling back undoes the changes done from now on), the move of apply cannot be reverted anymore """
+		self.key        = None
+		self.configs    = {}
+		self.counts     = None
+		self.sums       = None
+		self.journal    = []
+		self.savepoints = [(x[0], 0, self.stateHash, self.typeHashes[:]) for x in self.savepoints if x[0]!=self.lastMove]
+		self.lastMove   = None
+
+	## checkObject
+	## --------------------------------------------------------------------
+	def checkObject(self, handle, slotin, obj, slotout):
+		""" checks if an object handle can be applied to the current problem space """
+		## check the static part (slot types, coupling of the handle) in the precompiled table
+		rule = self.rules[handle.id].get((slotin.id, slotout.id))
+		if not rule: return False
+		## check if the output slot can take another object or is full already
+		if slotout.numberOfLayers <= len(slotout.holds): return False
+		## check if output slot has constraints (against the top-most object and the running sums)
+		asc, desc, noNeg, noPos = self.constraints[slotout.id]
+		values = self.values[obj.id]
+		if len(slotout.holds)>0:
+			top = self.values[slotout.holds[-1].id]
+			for i in asc : 
+				if top[i] >= values[i]: return False
+			for i in desc: 
+				if top[i] <= values[i]: return False
+			sums = self.propSums()[slotout.id]
+			for i in noNeg:
+				if sums[i] + values[i] < 0: return False
+			for i in noPos:
+				if sums[i] + values[i] > 0: return False
+		## find the current place of the object
+		myslot = self.findSlot(obj)
+		if not myslot: return False
+		## check if the slot of the object is the same as the input slot
+		if slotin != myslot: return False
+		## check if input slot has constraints (gradient constraints already checked through slotout)
+		asc, desc, noNeg, noPos = self.constraints[slotin.id]
+		if len(slotin.holds)>0 and (noNeg or noPos):
+			sums = self.propSums()[slotin.id]
+			for i in noNeg:
+				if sums[i] - values[i] < 0: return False
+			for i in noPos:
+				if sums[i] - values[i] > 0: return False
+		## check if object is on the the top-most layer of the slot
+		if myslot.type.ordered==1 and myslot.holds.index(obj)+1 != len(myslot.holds): return False
+		## check position of the output slot in case it is the hand
+		posOut, posIn = rule
+		if posOut is not None and slotout.slot.id != posOut: return False
+		if posIn  is not None and slotin .slot.id != posIn : return False
+		return True
+
+	## checkSlot
+	## --------------------------------------------------------------------
+	def checkSlot(self, handle, slotin, movable, slotout):
+		""" checks if a slot handle can be applied to the current problem space """
+		## check the static part (slot types, coupling of the handle, bound slots of the movable) in the precompiled table
+		rule = self.rules[handle.id].get((slotin.id, slotout.id))
+		if not rule or movable.stype!="slot" or movable.id not in rule: return False
+		## find the current slot of the movable
+		myslot = movable.slot
+		if not myslot: return False
+		## check if movable is on the required input slot
+		if myslot.id != slotin.id: return False
+		return True
+
+	## compile
+	## --------------------------------------------------------------------
+	def compile(self):
+		""" precompiles the static part of the legality of every handle for every pair of input and output slots """
+		self.rules   = [None]*self.symbols.size("handle")
+		self.weights = np.zeros(self.symbols.size("slot"))
+		for slot in self.current: self.weights[slot.id] = slot.score
+		self.compileConstraints()
+		for handle in self.handles:
+			rules = {}
+			for slotin in self.current:
+				for slotout in self.current:
+					rule = self.compileObject(handle, slotin, slotout) if handle.modulate=="object" else self.compileSlot(handle, slotin, slotout)
+					if rule: rules[(slotin.id, slotout.id)] = rule
+			self.rules[handle.id] = rules
+
+	## compileConstraints
+	## --------------------------------------------------------------------
+	def compileConstraints(self):
+		""" compiles the slot constraints into indices of the constrained properties and a table of their values per object """
+		kinds = ("gradientAsc", "gradientDesc", "noNegSum", "noPosSum")
+		props = []
+		for slot in self.current:
+			for kind in kinds:
+				props.extend(x for x in getattr(slot, kind) if x not in props)
+		self.values = np.zeros((self.symbols.size("object"), len(props)))
+		for obj in self.objects:
+			for i,prop in enumerate(props):
+				if prop in obj.props: self.values[obj.id][i] = obj.props[prop]
+		self.constraints = [((), (), (), ())]*self.symbols.size("slot")
+		for slot in self.current:
+			self.constraints[slot.id] = tuple(tuple(props.index(x) for x in getattr(slot, kind)) for kind in kinds)
+
+	## compileObject
+	## --------------------------------------------------------------------
+	def compileObject(self, handle, slotin, slotout):
+		""" returns the positions required for the channels (output, input) if an object handle may move from slotin to slotout, else None """
+		## check if output slot is of proper type
+		if slotout.type.name == "pos": return None
+		## check if handle can couple to the input and output slot
+		if not couples(handle.final, slotout) or not couples(handle.initial, slotin): return None
+		## the position of the output slot needs to match in case it is the hand
+		posOut = None
+		posIn  = None
+		if slotout.type.name=="channel":
+			if not slotin.pos: return None
+			posOut = slotin.pos.id
+		if slotin .type.name=="channel":
+			if not slotout.pos: return None
+			posIn  = slotout.pos.id
+		return (posOut, posIn)
+
+	## compileSlot
+	## --------------------------------------------------------------------
+	def compileSlot(self, handle, slotin, slotout):
+		""" returns the ids of the movable slots a slot handle may move from slotin to slotout, else None """
+		## check if handle can couple to slots
+		if handle.initial.name!="pos" or handle.final.name!="pos": return None
+		## check if input and output slot are of proper type
+		if slotin.type.name != "pos" or slotout.type.name != "pos": return None
+		## check which movables can move to that output slot
+		movables = frozenset(x.id for x in self.current if x.isMovable and slotout in x.bound)
+		return movables if len(movables)>0 else None
 
 	## config
 	## --------------------------------------------------------------------
 	def config(self, collection="current"):
-		""" returns a Config object that corresponds to this task """
-		return Config(self, fromTask=collection)
+		""" returns a Config object that corresponds to this task; it is built once per state and shared, so it must not be modified (see Config.copy) """
+		config = self.configs.get(collection)
+		if config and config.name=="%s_%s"%(self.name, collection): return config
+		config = Config(self, fromTask=collection)
+		self.configs[collection] = config
+		return config
 
 	## copy
 	## --------------------------------------------------------------------
@@ -457,6 +1092,10 @@ class Task:
 	## --------------------------------------------------------------------
 	def findSlot(self, movable):
 		""" finds the current slot (loation) of a given object or slot (movable) """
+		## the slot the movable points to is checked first
+		if self.index and movable.slot:
+			slot = self.index["current"][movable.slot.id]
+			if slot and movable in slot.holds: return slot
 		for slot in self.current:
 			if movable.name not in [x.name for x in slot.holds]: continue
 			return slot
@@ -471,30 +1110,57 @@ class Task:
 			return slot
 		return None
 
+	## legalMoves
+	## --------------------------------------------------------------------
+	def legalMoves(self):
+		""" enumerates all legal moves (handle, slotin, movable, slotout) from the current state in one pass over the precompiled tables """
+		moves = []
+		slots = self.index["current"]
+		for handle in self.handles:
+			movables = self.getMovables(handle.modulate) if handle.modulate!="object" else None
+			for (sin, sout),rule in self.rules[handle.id].items():
+				slotin  = slots[sin ]
+				slotout = slots[sout]
+				if not slotin or not slotout: continue
+				## objects: only the top-most one of an ordered slot can be moved
+				if movables is None:
+					objs = slotin.holds[-1:] if slotin.type.ordered==1 else slotin.holds
+					moves.extend((handle, slotin, x, slotout) for x in objs if self.checkObject(handle, slotin, x, slotout))
+					continue
+				moves.extend((handle, slotin, x, slotout) for x in movables if self.checkSlot(handle, slotin, x, slotout))
+		return moves
+
 	## load
 	## --------------------------------------------------------------------
 	def load(self, triangle=None):
 		""" builds the problem space of the task at hand """
 
+		## all items are registered in the symbol table when created
+		self.symbols = SymbolTable()
+		self.index   = None
+
 		## general properties
 
 		## load object types
 		for entry in self.aps.j["objectTypes"]:
-			item            = Item(self, "objectType", entry["name"])
+			item            = ObjectType(self, entry["name"])
 			item.properties = entry["properties"]
+			self.symbols.add(item)
 			self.objectTypes.append(item)
 		## load slot types
 		for entry in self.aps.j["slotTypes"]:
-			item       = Item(self, "slotType", entry["name"])
+			item       = SlotType(self, entry["name"])
 			storeVals(item, entry, ["numberOfLayers", "ordered", "gradientAsc", "gradientDesc", "noNegSum", "noPosSum"])
+			self.symbols.add(item)
 			self.slotTypes.append(item)
 		## load actions
 		## FIXME: not implemented in this version
 		pass
 		## load handles
 		for entry in self.aps.j["handles"]:
-			item         = Item(self, "handle", entry["name"])
+			item         = Handle(self, entry["name"])
 			storeVals(item, entry, ["type", "modulate"])
+			self.symbols.add(item)
 			self.handles.append(item)
 ## FIXME: uncomment once actions are implemented
 #		## link actions back to the object types
@@ -506,18 +1172,18 @@ class Task:
 
 		## load objects
 		for entry in self.aps.j["task"]["objects"]:
-			item            = Item(self, "object", entry["name"])
+			item            = Object(self, entry["name"])
+			self.symbols.add(item)
 			item.type       = self.getObjectType(entry["type"])
-			item.isMovable  = True
-			item.slot       = None
 			for prop in item.type.properties:
-				setattr(item, prop, entry[prop])
+				item.props[prop] = entry[prop]
 			self.objects.append(item)
 		## load slots
 		inherit = ["numberOfLayers", "gradientAsc", "gradientDesc", "noNegSum", "noPosSum"]
 		for entry in self.aps.j["task"]["slots"]:
 			objs           = [self.getObject(x) for x in entry["holds"]]
-			item           = Item(self, "slot", entry["name"])
+			item           = Slot(self, entry["name"])
+			self.symbols.add(item)
 			item.type      = self.getSlotType(entry["type"])
 			item.holds     = objs
 			item.score     = entry["score"]
@@ -544,6 +1210,7 @@ class Task:
 			item.holds = [self.getObject(x) for x in entry["holds"]]
 			for x in entry["holds"]: self.getObject(x).slot = item
 		self.initial = [x.copy() for x in self.current]
+		self.buildIndex()
 		## set final state
 		for entry in self.aps.j["task"]["final"]:
 			item       = self.getSlot(entry["name"], "final")
@@ -561,8 +1228,14 @@ class Task:
 				item = self.getItem(key)
 				storeVals(item, entry, list(entry.keys()))
 
-		## book-keep the task for revert
-		self.before = Task(self.aps, "%s_before"%self.name)
+		## precompile the static part of the legality of moves
+		self.compile()
+		## draw the random keys of the state hash
+		self.symbols.buildZobrist()
+		self.rehash()
+
+		## start book-keeping for revert from scratch
+		self.clearJournal()
 
 	## log
 	## --------------------------------------------------------------------
@@ -573,50 +1246,188 @@ class Task:
 			holds[slot.name] = [x.name for x in slot.holds]
 		return holds
 
+	## record
+	## --------------------------------------------------------------------
+	def record(self, item, attr):
+		""" marks the state as changed and records the value of an attribute of an item before it is modified (only if a savepoint is open) """
+		self.key     = None
+		self.configs = {}
+		if len(self.savepoints)==0: return
+		value = getattr(item, attr)
+		self.journal.append((item, attr, value[:] if type(value)==list else value))
+
+	## propSums
+	## --------------------------------------------------------------------
+	def propSums(self):
+		""" returns the running sums of the constrained properties per slot of the current state """
+		if self.sums is None: self.sums = buildSums(self.current, self.values, self.symbols.size("slot"))
+		return self.sums
+
+	## rehash
+	## --------------------------------------------------------------------
+	def rehash(self):
+		""" computes the state hash of the current state (and the ones per slot type) from scratch """
+		self.stateHash  = 0
+		self.typeHashes = [0]*self.symbols.size("slotType")
+		for slot in self.current:
+			self.toggle(slot, self.symbols.presentKey(slot))
+			for layer,obj in enumerate(slot.holds): self.toggle(slot, self.symbols.holdKey(slot, obj, layer))
+			if slot.isMovable: self.toggle(slot, self.symbols.posKey(slot, slot.slot))
+
+	## release
+	## --------------------------------------------------------------------
+	def release(self, sp):
+		""" closes a savepoint and keeps all changes done since (the savepoint must still be open) """
+		if not any(x[0]==sp for x in self.savepoints): raise ValueError("savepoint %s is not open"%sp)
+		if self.lastMove==sp: self.lastMove = None
+		self.savepoints = [x for x in self.savepoints if x[0]!=sp]
+		## nothing left to roll back to, so the journal can be forgotten
+		if len(self.savepoints)==0: self.journal = []
+
 	## reload
 	## --------------------------------------------------------------------
 	def reload(self, task, triangle):
-		""" take a subset of another task for a given triangle """
-		## copy data from other task
-		copyTaskData(task, self)
-		## apply the triangle
-		self.applyTriangle(triangle)
+		""" take a subset of another task for a given triangle, only the slots inside the triangle (and the objects they hold) are copied """
+		ids = triangle.slotIds() if triangle else None
+		copyTaskData(task, self, ids if ids else None)
+
+	## recover
+	## --------------------------------------------------------------------
+	def recover(self, task, config):
+		""" takes the subset of another task for the slots of a config and resets it to the state of that config """
+		## the objects held in that state may have left these slots since
+		objIds = [x for holds in config.key().holds if holds for x in holds]
+		copyTaskData(task, self, config.slotIds(), objIds)
+		self.reset(config)
 
 	## reset
 	## --------------------------------------------------------------------
 	def reset(self, config):
-		""" resets the task to a given state; assumes that the triangles are equal """
+		""" resets the task to a given state, touching only the slots that differ; assumes that the triangles are equal """
+		## fast path: the config keeps the ids of what the slots hold
+		if config.layout is not None:
+			state   = config.key()
+			slots   = self.index["current"]
+			objects = self.index["objects"]
+			for sid,ids in enumerate(config.layout):
+				if ids is None or not slots[sid]: continue
+				mySlot = slots[sid]
+				self.assign(mySlot, [objects[x] for x in ids])
+				if mySlot.type.name=="channel": self.assignPos(mySlot, slots[state.slots[sid]])
+			return
 		for slot in config.slots:
 			mySlot = self.getSlot(slot.name)
-			myObjs = [self.getObject(x.name) for x in slot.holds]
-			mySlot.holds = myObjs
-			for obj in myObjs: obj.slot = mySlot
-			if slot.type.name=="channel": mySlot.slot = self.getSlot(slot.slot.name)
+			self.assign(mySlot, [self.getObject(x.name) for x in slot.holds])
+			if slot.type.name=="channel": self.assignPos(mySlot, self.getSlot(slot.slot.name))
+
+	## resolve
+	## --------------------------------------------------------------------
+	def resolve(self, strategy):
+		""" returns the items of this task a strategy refers to (handle, slotin, movable, slotout) by id, None if not present """
+		slots   = self.index["current"]
+		movable = strategy.movable
+		movable = self.index["objects"][movable.id] if movable.stype=="object" else slots[movable.id]
+		return self.index["handles"][strategy.handle.id], slots[strategy.slotin.id], movable, slots[strategy.slotout.id]
+
+	## restore
+	## --------------------------------------------------------------------
+	def restore(self, key):
+		""" restores the current state from a StateKey, touching only the slots that differ; assumes that the triangles are equal """
+		slots   = self.index["current"]
+		objects = self.index["objects"]
+		for sid,holds in enumerate(key.holds):
+			if holds is None or not slots[sid]: continue
+			mySlot = slots[sid]
+			self.assign(mySlot, [objects[x] for x in holds])
+			if key.slots[sid] is not None: self.assignPos(mySlot, slots[key.slots[sid]] or mySlot.slot)
 
 	## revert
 	## --------------------------------------------------------------------
 	def revert(self):
 		""" reverts/undoes the last move invoked with the apply method """
-		copyTaskData(self.before, self)
+		if not self.lastMove: return
+		self.rollback(self.lastMove)
+		self.lastMove = None
+
+	## rollback
+	## --------------------------------------------------------------------
+	def rollback(self, sp):
+		""" undoes all changes done since a given savepoint and closes it, together with all savepoints opened after it (the savepoint must still be open) """
+		marks = [x for x in self.savepoints if x[0]==sp]
+		if len(marks)==0: raise ValueError("savepoint %s is not open"%sp)
+		## restore the recorded values in reverse order
+		while len(self.journal)>marks[0][1]:
+			item, attr, value = self.journal.pop()
+			setattr(item, attr, value)
+			if attr=="holds": self.tally(item)
+		self.key        = None
+		self.configs    = {}
+		self.stateHash  = marks[0][2]
+		self.typeHashes = marks[0][3][:]
+		self.savepoints = [x for x in self.savepoints if x[0]<sp]
+		if len(self.savepoints)==0: self.journal = []
+		## the move of apply may have been undone as well
+		if self.lastMove and self.lastMove>=sp: self.lastMove = None
+
+	## savepoint
+	## --------------------------------------------------------------------
+	def savepoint(self):
+		""" opens a (nested) savepoint and returns its id; changes since are undone by rollback or kept by release;
+		    rolling back a savepoint closes all savepoints opened after it, and a closed savepoint cannot be rolled back or released again """
+		self.numSps += 1
+		self.savepoints.append((self.numSps, len(self.journal), self.stateHash, self.typeHashes[:]))
+		return self.numSps
+
+	## scoreVector
+	## --------------------------------------------------------------------
+	def scoreVector(self, collection="current"):
+		""" returns the score vector of a collection of slots, the counts of the current state are updated as objects are moved """
+		if collection!="current": return buildScores(self.weights, buildCounts(getattr(self, collection), self.symbols.size("slot")))
+		if self.counts is None: self.counts = buildCounts(self.current, self.symbols.size("slot"))
+		return buildScores(self.weights, self.counts)
+
+	## stateKey
+	## --------------------------------------------------------------------
+	def stateKey(self, collection="current"):
+		""" returns the StateKey of a collection of slots, the one of the current state is kept until the state changes """
+		if collection!="current": return buildStateKey(getattr(self, collection), self.symbols.size("slot"))
+		if not self.key: self.key = buildStateKey(self.current, self.symbols.size("slot"))
+		return self.key
+
+	## tally
+	## --------------------------------------------------------------------
+	def tally(self, slot):
+		""" recomputes the count and the sums of a slot after what it holds has been replaced """
+		if self.counts is not None: self.counts[slot.id] = len(slot.holds)
+		if self.sums   is not None: self.sums  [slot.id] = sumHolds(slot.holds, self.values)
+
+	## toggle
+	## --------------------------------------------------------------------
+	def toggle(self, slot, key):
+		""" toggles a key in the state hash and in the hash of the slot type of the slot it belongs to """
+		self.stateHash ^= key
+		self.typeHashes[slot.type.id] ^= key
+
+	## typeHash
+	## --------------------------------------------------------------------
+	def typeHash(self, stype):
+		""" returns the state hash restricted to the slots of a given slot type (0 if there is no such type) """
+		i = self.symbols.getId("slotType", stype)
+		return self.typeHashes[i] if i is not None else 0
 
 	## update
 	## --------------------------------------------------------------------
 	def update(self, smaller):
-		""" inserts the positions of a smaller task into this task, updating the condition of the slots involved """
+		""" inserts the positions of a smaller task into this task, updating only the slots whose condition differs """
+		slots   = self.index["current"]
+		objects = self.index["objects"]
 		## move the objects of this task according to location in the other task
 		for slot in smaller.current:
-			mySlot = self.getSlot(slot.name)
-			mySlot.holds = []
-			for obj in slot.holds:
-				myObj      = self.getObject(obj.name)
-				myObj.slot = mySlot
-				mySlot.holds.append(myObj)
+			self.assign(slots[slot.id], [objects[x.id] for x in slot.holds])
 		## move all channels of this task	
-		for movable in smaller.getMovables():
-			if     movable.stype=="object": continue
-			if not movable.isMovable      : continue
-			myMovable      = self.getSlot(movable.name)
-			myMovable.slot = self.getSlot(smaller.getSlot(movable.name).slot.name)
+		for movable in smaller.current:
+			if not movable.isMovable: continue
+			self.assignPos(slots[movable.id], slots[movable.slot.id])
 
 
 
@@ -636,7 +1447,28 @@ class Exterior:
 	## --------------------------------------------------------------------
 	def do(self, task, strategy):
 		""" apply an LCT strategy to the Exterior, generate response (True if it worked, False if not) """
-		## try to execute it (note that items are re-picked from the task according to name)
-		return task.apply(task.getHandle(strategy.handle.name), task.getSlot(strategy.slotin.name), task.getMovable(strategy.movable.name), task.getSlot(strategy.slotout.name))
+		## try to execute it (note that items are re-picked from the task according to id)
+		return task.apply(*task.resolve(strategy))
+
+	## legalMoves
+	## --------------------------------------------------------------------
+	def legalMoves(self, task):
+		""" enumerates all moves (handle, slotin, movable, slotout) that the Exterior accepts in the current state of the task """
+		return task.legalMoves()
+
+	## run
+	## --------------------------------------------------------------------
+	def run(self, task, moves, commit=False):
+		""" applies a sequence of LCT strategies to a task, returns the index of the first move that fails (len(moves) if all work);
+		    the moves that worked are kept if commit is true, otherwise the task is rolled back (dry run) """
+		sp = task.savepoint()
+		for i,move in enumerate(moves):
+			if task.apply(*task.resolve(move)): continue
+			if commit: task.release (sp)
+			else     : task.rollback(sp)
+			return i
+		if commit: task.release (sp)
+		else     : task.rollback(sp)
+		return len(moves)
 
 
@@ -1,9 +1,78 @@
 import random
 from numpy.random import choice as npchoice
 
+from library.budget    import Budget
 from library.component import Component
 
 
+## moveKey
+## ------------------------------------------------------------------------
+def moveKey(handle, slotin, movable, slotout):
+	""" builds the hashable key identifying an LCT move (movables can be objects or slots, hence the symbol type) """
+	return (handle.id, slotin.id, movable.stype, movable.id, slotout.id)
+
+
+
+
+## MoveSet
+## ========================================================================
+class MoveSet:
+	""" ordered list of LCT moves with a hash set of their keys for fast membership tests """
+
+	## __init__
+	## --------------------------------------------------------------------
+	def __init__(self):
+		""" constructor """
+		self.moves = []    ## the moves in the order they were added
+		self.keys  = set() ## keys of the moves
+
+	## __contains__
+	## --------------------------------------------------------------------
+	def __contains__(self, move):
+		""" checks if a move is in the set """
+		return move.key() in self.keys
+
+	## __getitem__
+	## --------------------------------------------------------------------
+	def __getitem__(self, idx):
+		""" returns the move(s) at the given index or slice """
+		return self.moves[idx]
+
+	## __iter__
+	## --------------------------------------------------------------------
+	def __iter__(self):
+		""" iterator """
+		return iter(self.moves)
+
+	## __len__
+	## --------------------------------------------------------------------
+	def __len__(self):
+		""" length """
+		return len(self.moves)
+
+	## append
+	## --------------------------------------------------------------------
+	def append(self, move):
+		""" adds a move to the set """
+		self.moves.append(move)
+		self.keys.add(move.key())
+
+	## clear
+	## --------------------------------------------------------------------
+	def clear(self):
+		""" removes all moves from the set """
+		self.moves = []
+		self.keys  = set()
+
+	## hasKey
+	## --------------------------------------------------------------------
+	def hasKey(self, key):
+		""" checks if a move with the given key is in the set """
+		return key in self.keys
+
+
+
+
 ## StrategyLct
 ## ========================================================================
 class StrategyLct:
@@ -27,7 +96,13 @@ class StrategyLct:
 	## --------------------------------------------------------------------
 	def __eq__(self, other):
 		""" tests if this StrategyLct object is the same as another StrategyLct object """
-		return self.handle.name==other.handle.name and self.slotin.name==other.slotin.name and self.movable.name==other.movable.name and self.slotout.name==other.slotout.name
+		return self.key()==other.key()
+
+	## __hash__
+	## --------------------------------------------------------------------
+	def __hash__(self):
+		""" hash of the move, consistent with __eq__ """
+		return hash(self.key())
 
 	## __neq__
 	## --------------------------------------------------------------------
@@ -41,6 +116,12 @@ class StrategyLct:
 		""" dumps the content of this object to screen (for debugging) """
 		return "StrategyLct (%s, %s, %s, %s, %s)"%(self.name, self.handle.name, self.slotin.name, self.movable.name, self.slotout.name)
 
+	## key
+	## --------------------------------------------------------------------
+	def key(self):
+		""" returns the hashable key identifying this move """
+		return moveKey(self.handle, self.slotin, self.movable, self.slotout)
+
 	## read
 	## --------------------------------------------------------------------
 	def read(self, d):
@@ -72,8 +153,8 @@ class LCT(Component):
 		super(LCT, self).__init__(aps, "lct")
 		self.ext          = None ## link to the exterior
 		self.int          = None ## link to the first stage of the internal branch
-		self.recentMoves  = []   ## moves carried out recently
-		self.blockedMoves = []   ## moves blocked top-down from INT
+		self.recentMoves  = MoveSet() ## moves carried out recently
+		self.blockedMoves = MoveSet() ## moves blocked top-down from INT
 
 	## do
 	## --------------------------------------------------------------------
@@ -85,23 +166,27 @@ class LCT(Component):
 			self.log("top-down", "taskInst", taskInst    .name)
 		## select task instance to use
 		task     = taskInst if taskInst else self.task
-		## select strategy to apply
-		strategy = self.selectStrategy(task, topDownStrat)
-		## if no strategy has been found, proceed to next iteration
-		if not strategy: return False
-		## record job data
-		self.log("before" , "task"    , task.log()   )
-		self.log("planned", "strategy", strategy.name)
-		## apply strategy to exterior, capture feedback
-		success  = self.ext.do(task, strategy)
-		## virtual mode, only the top-down strategy should be tested
-		if probe: 
-			return success
-		## if false, retry next time 
+		## if the strategy fails, retry
 		## (i.e. LCT does potentially multiple sub-iterations per iteration of the simulation in order to find a move that works) 
-		if not success:
+		budget   = Budget(self.aps.j["simulation"]["maxRecsLct"])
+		success  = False
+		while not success:
+			## if total maximum attempts reached, proceed to next iteration
+			if not budget.spend(): return False
+			## select strategy to apply
+			strategy = self.selectStrategy(task, topDownStrat)
+			## if no strategy has been found, proceed to next iteration
+			if not strategy: return False
+			## record job data
+			self.log("before" , "task"    , task.log()   )
+			self.log("planned", "strategy", strategy.name)
+			## apply strategy to exterior, capture feedback
+			success  = self.ext.do(task, strategy)
+			## virtual mode, only the top-down strategy should be tested
+			if probe: 
+				return success
 			## real mode: here we can try to find a new strategy
-			return self.do(taskInst=taskInst)
+			topDownStrat = None
 		## record job
 		self.log("used" , "success" , success      ) ## this will always be true, because LCT always makes sure that it succeeds
 		self.log("used" , "strategy", strategy.name)
@@ -121,43 +206,18 @@ class LCT(Component):
 		""" saves the current strategy into long-term memory and working memory """
 		self.aps.cache.permanentize(lct = strategy)
 
-	## selectMovable
-	## --------------------------------------------------------------------
-	def selectMovable(self, task, handle):
-		""" selects a random movable payload (object or slot) for a given handle """
-		if handle.modulate=="object": 
-			slotin = self.selectSlot(task, handle.initial)
-			if len(slotin.holds)==0: return None
-			return random.choice(slotin.holds)
-		channels = task.getMovables(handle.modulate)
-		if len(channels)<1: return None
-		return channels[0]
-
-	## selectSlot
-	## --------------------------------------------------------------------
-	def selectSlot(self, task, theSlot, other=None):
-		""" selects a random slot for a given handle """
-		if theSlot in task.getChannels():
-			return task.getSlot(theSlot.name)
-		slots = []
-		for slot in task.current:
-			if other and slot == other       : continue
-			if slot.type.name != theSlot.name: continue
-			slots.append(slot)
-		return random.choice(slots)
-
 	## selectStrategy
 	## --------------------------------------------------------------------
 	def selectStrategy(self, task, topDownStrat=None):
 		""" select the next strategy (i.e. combination of handle and payload) to be applied """
 		## strategy forced top-down
 		if topDownStrat: 
-			self.recentMoves = [] ## we only reset the list of good moves once a new top-down strategy comes
+			self.recentMoves.clear() ## we only reset the list of good moves once a new top-down strategy comes (probes via Exterior.run do not get here)
 			return topDownStrat
 		## inserted randomness: not necessarily proceed with a known LCT move, but try to create a new one
 		choice = npchoice([0,1], 1, p=[self.aps.j["simulation"]["probRedoLct"], 1-self.aps.j["simulation"]["probRedoLct"]])
 		if choice==0: 
-			return self.selectStrategyNewMove(task, 0)
+			return self.selectStrategyNewMove(task)
 		## find an applicable strategy from long-term memory based on condition
 		for move in self.allMoves:
 			if move in self.recentMoves : continue ## avoid going in circles
@@ -165,35 +225,24 @@ class LCT(Component):
 			self.recentMoves.append(move) ## also add this one to recent moves, to avoid re-generating the same move
 			return move
 		## generate random strategy
-		return self.selectStrategyNewMove(task, 0)
+		return self.selectStrategyNewMove(task)
 
 	## selectStrategyNewMove
 	## --------------------------------------------------------------------
-	def selectStrategyNewMove(self, task, it):
-		""" generates a new strategy randomly """
-		## if total maximum iterations reached, abort, sacrificing an iteration
-		if it==self.aps.j["simulation"]["maxRecsLct"]: 
+	def selectStrategyNewMove(self, task):
+		""" generates a new strategy, drawn uniformly from the legal moves that are not known, recent or blocked """
+		name       = "lct_%03d"%(len(self.allMoves)+1)
+		candidates = []
+		for handle, slotin, movable, slotout in self.ext.legalMoves(task):
+			key = moveKey(handle, slotin, movable, slotout)
+			## if a strategy like that exists already or is forbidden, skip it
+			if self.allMoves.findKey(key)                                   : continue
+			if self.recentMoves.hasKey(key) or self.blockedMoves.hasKey(key): continue
+			candidates.append((handle, slotin, movable, slotout))
+		## no legal move left, sacrifice an iteration
+		if len(candidates)==0: 
 			return None
-		## generate random strategy
-		handle   = random.choice(task.handles)
-		movable  = self.selectMovable(task, handle)
-		## cannot find movable or its slot in the triangle
-		if not movable or not movable.slot: 
-			return self.selectStrategyNewMove(task, it+1)
-		## search for output slot
-		slotout  = self.selectSlot   (task, handle.final, movable.slot)
-		if not slotout: return self.selectStrategyNewMove(task, it+1)
-		## assemble the strategy
-		name     = "lct_%03d"%(len(self.allMoves)+1)
-		strategy =  StrategyLct(self.aps, name, handle, movable.slot, movable, slotout)
-		## if a strategy like that exists already, retry
-		if strategy in list(self.allMoves): 
-			return self.selectStrategyNewMove(task, it+1)
-		## if the strategy is forbidden, retry
-		if strategy in self.recentMoves or strategy in self.blockedMoves: 
-			return self.selectStrategyNewMove(task, it+1)
 		## return strategy
+		strategy = StrategyLct(self.aps, name, *random.choice(candidates))
 		self.recentMoves.append(strategy) ## also add this one to recent moves, to avoid re-generating the same move
 		return strategy
-
-
@@ -17,6 +17,23 @@ def areEqualLists(list1, list2):
 	""" compares two lists for equal content """
 	return set([x for x in list1 if x in list2]) == set(list2)
 
+## reducePath
+## ------------------------------------------------------------------------
+def reducePath(path, size, merge):
+	""" rewrites windows of a given size in a path from left to right in a single pass, merge returns the replacement of a window (shorter than it) or None """
+	done = []         ## reduced part of the path
+	todo = path[::-1] ## remaining part of the path (reversed, to pop from the front)
+	while len(todo)>0:
+		done.append(todo.pop())
+		if len(done)<size: continue
+		## check the window ending at the last move
+		repl = merge(done[-size:])
+		if repl is None: continue
+		## replace the window and check again the windows overlapping with the replacement
+		del done[-size:]
+		todo.extend(repl[::-1])
+	return done
+
 ## mkfile
 ## ------------------------------------------------------------------------
 def mkfile(path):
@@ -1,12 +1,13 @@
 import math
-import more_itertools
 import random
 from numpy.random import choice as npchoice
 
+from library.budget    import Budget
 from library.cache     import Condition
 from library.component import Component
 from library.exterior  import Config, Task, createTask, copyTaskData
-from library.functions import areEqualLists
+from library.functions import areEqualLists, reducePath
+from library.memo      import Memo
 
 
 ## buildIntPath
@@ -20,41 +21,48 @@ def buildIntPath(posteriors):
 
 ## checkIntMoves
 ## ------------------------------------------------------------------------
-def checkIntMoves(first, last, inbetween):
-	""" checks if two INT moves (first and last) can be combined to a single move """
+def checkIntMoves(first, last, inbetween, objs):
+	""" checks if two INT moves (first and last) can be combined to a single move, objs caches the objects of the moves """
 	## first and last move need to deal with the same object
-	fobjs = list(set([x.movable.name for x in first.moves if x.movable.type.name!="channel"]))
-	lobjs = list(set([x.movable.name for x in last .moves if x.movable.type.name!="channel"]))
-	if len(fobjs)!=1 or len(lobjs)!=1 or fobjs[0]!=lobjs[0]: return False
+	fobjs = getMovedObjects(first, objs)
+	lobjs = getMovedObjects(last , objs)
+	if len(fobjs)!=1 or fobjs!=lobjs: return False
 	## moves in between may not have dealt with the same object
-	bobjs = []
 	for y in inbetween:
-		bobjs.extend([x.movable.name for x in y.moves if x.movable.type.name!="channel"])
-	if fobjs[0] in bobjs: return False
+		if not fobjs.isdisjoint(getMovedObjects(y, objs)): return False
 	## the output slot of the first move must be the same as the input slot of the last move
 	if first.slotout != last.slotin: return False
 	## the moves can be combined
 	return True
 
+## getMovedObjects
+## ------------------------------------------------------------------------
+def getMovedObjects(intMove, objs):
+	""" returns the names of the (non-channel) objects moved by an INT move, cached in objs by the id of the move """
+	entry = objs.get(id(intMove))
+	if not entry:
+		entry = (intMove, frozenset([x.movable.name for x in intMove.moves if x.movable.type.name!="channel"])) ## keeps the move alive, so the id stays unique
+		objs[id(intMove)] = entry
+	return entry[1]
+
+## mergeIntMoves
+## ------------------------------------------------------------------------
+def mergeIntMoves(window, objs):
+	""" merges the first and last INT move of a window if possible, returns None if they cannot be merged """
+	first = window[0]
+	last  = window[-1]
+	inb   = window[1:-1]
+	## check if moves can be merged
+	if not checkIntMoves(first, last, inb, objs): return None
+	## merge last into first
+	return [first.merge(last)] + inb
+
 ## reduceIntMoves
 ## ------------------------------------------------------------------------
 def reduceIntMoves(moves, size):
 	""" reduces a path of INT moves by checking windows of a given size """
-	windows = [
-		tuple(window)
-		for window in more_itertools.windowed(moves, size)
-	]
-	for i,window in enumerate(windows):
-		first = window[0]
-		last  = window[-1]
-		inb   = [x for x in window[1:-1]] ## needs to be list not tuple
-		## check if moves can be merged, if not, continue to next window
-		if not checkIntMoves(first, last, inb): continue
-		## merge last into first and remove from list
-		newmoves = moves[0:i] + [first.merge(last)] + inb + moves[i+size:]
-		return reduceIntMoves(newmoves, size)
-	## the loop finishes only when no moves could be combined anymore, so return the list of moves
-	return moves
+	objs = {}
+	return reducePath(moves, size, lambda window: mergeIntMoves(window, objs))
 
 ## reduceIntPath
 ## ------------------------------------------------------------------------
@@ -136,8 +144,57 @@ def getListOfObjects(intMoves):
 	""" collects a list of all objects involved in given INT moves """
 	touched = []
 	for intMove in intMoves:
-		touched.extend([x.movable for x in intMoves.moves])
-	return list(set(touched))
+		for lctMove in intMove.moves:
+			if lctMove.movable in touched: continue
+			touched.append(lctMove.movable)
+	return touched
+
+## triangleKey
+## ------------------------------------------------------------------------
+def triangleKey(slots):
+	""" returns the canonical key of a triangle made of the given slots (their sorted ids) """
+	return tuple(sorted(x.id for x in slots))
+
+
+
+
+## StateSet
+## ========================================================================
+class StateSet:
+	""" ordered list of the states of a task (as configs) with a hash set of their hashes restricted to the pin slots, for fast membership tests """
+
+	## __init__
+	## --------------------------------------------------------------------
+	def __init__(self):
+		""" constructor """
+		self.configs = []    ## the states in the order they were added
+		self.keys    = set() ## hashes of the states (pin slots only, see Task.typeHash)
+
+	## __contains__
+	## --------------------------------------------------------------------
+	def __contains__(self, task):
+		""" checks if the current state of a task (in its pin slots) is in the set """
+		return task.typeHash("pin") in self.keys
+
+	## __len__
+	## --------------------------------------------------------------------
+	def __len__(self):
+		""" length """
+		return len(self.configs)
+
+	## add
+	## --------------------------------------------------------------------
+	def add(self, task, name):
+		""" adds the current state of a task to the set """
+		self.configs.append(task.config().copy(name))
+		self.keys.add(task.typeHash("pin"))
+
+	## clear
+	## --------------------------------------------------------------------
+	def clear(self):
+		""" removes all states from the set """
+		self.configs = []
+		self.keys    = set()
 
 
 
@@ -154,6 +211,7 @@ class Triangle:
 		self.task  = task
 		self.name  = name
 		self.slots = slots
+		self.ids   = None ## ids of the slots (computed once, used to project tasks)
 		if fromDict: self.read(fromDict)
 
 	## __eq__
@@ -192,11 +250,18 @@ class Triangle:
 		""" dumps the content of this object to screen (for debugging) """
 		return "Triangle (%s)"%", ".join([x.name for x in self.slots])
 
+	## key
+	## --------------------------------------------------------------------
+	def key(self):
+		""" returns the hashable key identifying this triangle (sorted slot ids, as for __eq__) """
+		return triangleKey(self.slots)
+
 	## fromTask
 	## --------------------------------------------------------------------
 	def fromTask(self, task):
 		""" retrieve the slots (configuration) from a given task """
 		self.slots = [self.task.getSlot(x.name) for x in task.current]
+		self.ids   = None
 
 	## read
 	## --------------------------------------------------------------------
@@ -205,6 +270,13 @@ class Triangle:
 		self.name  = d["name"]
 		self.slots = [self.task.getSlot(x) for x in d["slots"]]
 
+	## slotIds
+	## --------------------------------------------------------------------
+	def slotIds(self):
+		""" returns the ids of the slots of this triangle """
+		if self.ids is None: self.ids = frozenset(x.id for x in self.slots)
+		return self.ids
+
 	## write
 	## --------------------------------------------------------------------
 	def write(self):
@@ -230,12 +302,18 @@ class ThreefoldWay:
 		self.conceptual = conceptual
 		self.symbolic   = symbolic
 		self.score      = sum(x.score for x in conceptual) if conceptual else 0
+		self.skey       = None ## structural key  (computed once, the move is not modified after construction)
+		self.shash      = None ## structural hash (computed once, from the structural key)
 		if fromDict: self.read(fromDict)
 
 	## __eq__
 	## --------------------------------------------------------------------
 	def __eq__(self, other):
 		""" tests if this ThreefoldWay object is the same as another ThreefoldWay object """
+		## compare identity, type and hash
+		if self is other: return True
+		if type(other)!=type(self): return False
+		if hash(self)!=hash(other): return False
 		## compare tensoral
 		if self.tensoral != other.tensoral: return False
 		## compare moves
@@ -248,6 +326,13 @@ class ThreefoldWay:
 		## return true
 		return True
 
+	## __hash__
+	## --------------------------------------------------------------------
+	def __hash__(self):
+		""" hash of the move, consistent with __eq__ """
+		if self.shash is None: self.shash = hash(self.key())
+		return self.shash
+
 	## __neq__
 	## --------------------------------------------------------------------
 	def __neq__(self, other):
@@ -260,12 +345,25 @@ class ThreefoldWay:
 		""" dumps the content of this object to screen (for debugging) """
 		return self.dump()
 
+	## bucket
+	## --------------------------------------------------------------------
+	def bucket(self):
+		""" returns the bucket of this move in collections, i.e. the ids of the slots of its triangle """
+		return self.tensoral.slotIds()
+
 	## dump
 	## --------------------------------------------------------------------
 	def dump(self):
 		""" dumps the content of this object to screen (for debugging) """
 		return "ThreefoldWay (%s; %s; %s; %s)"%(self.name, self.tensoral.name, ",".join(x.name for x in self.conceptual), "")
 
+	## key
+	## --------------------------------------------------------------------
+	def key(self):
+		""" returns the hashable key identifying this move (triangle, keys of the INT moves) """
+		if self.skey is None: self.skey = (self.tensoral.key(), tuple(x.key() for x in self.conceptual))
+		return self.skey
+
 	## read
 	## --------------------------------------------------------------------
 	def read(self, d):
@@ -302,12 +400,18 @@ class StrategyIc:
 		self.moves     = moves
 		self.confout   = confout
 		self.score     = sum(x.score for x in moves) if moves else 0
+		self.skey      = None ## structural key  (computed once, the move is not modified after construction)
+		self.shash     = None ## structural hash (computed once, from the structural key)
 		if fromDict: self.read(fromDict)
 
 	## __eq__
 	## --------------------------------------------------------------------
 	def __eq__(self, other):
 		""" tests if this StrategyIc object is the same as another StrategyIc object """
+		## compare identity, type and hash
+		if self is other: return True
+		if type(other)!=type(self): return False
+		if hash(self)!=hash(other): return False
 		## compare moves
 		if len(self.moves)!=len(other.moves): 
 			return False
@@ -320,6 +424,13 @@ class StrategyIc:
 		## return true
 		return True
 
+	## __hash__
+	## --------------------------------------------------------------------
+	def __hash__(self):
+		""" hash of the move, consistent with __eq__ """
+		if self.shash is None: self.shash = hash(self.key())
+		return self.shash
+
 	## __neq__
 	## --------------------------------------------------------------------
 	def __neq__(self, other):
@@ -332,6 +443,13 @@ class StrategyIc:
 		""" dumps the content of this object to screen (for debugging) """
 		return "StrategyIc (%s, %s, %s, %s)"%(self.name, self.confin.name, ",".join([x.name for x in self.moves]), self.confout.name)
 
+	## key
+	## --------------------------------------------------------------------
+	def key(self):
+		""" returns the hashable key identifying this move (input config, keys of the ICM moves, output config) """
+		if self.skey is None: self.skey = (self.confin.key(), tuple(x.key() for x in self.moves), self.confout.key())
+		return self.skey
+
 	## read
 	## --------------------------------------------------------------------
 	def read(self, d):
@@ -377,27 +495,27 @@ class ContextualModel(Component):
 		self.posteriors = []    ## used    downstream moves (e.g. ThreefoldWay object)
 		self.prev       = False ## downstream return value kept for later
 		self.before     = None  ## copy of the task before all moves
-		self.seen       = []    ## tasks and thus configs (NC states) seen before
+		self.seen       = StateSet() ## tasks and thus configs (NC states) seen before
 		self.numTruncs  = 0     ## number of truncations
 		self.deadEnd    = False ## true if the model has encountered a dead end
 		self.hardReload = False ## true if downstream component shall be reloaded hard (all tasks rebuild)
 		self.isFinal    = False ## true if the final state for that model has been reached
 		self.foundGoodOne = False
+		self.memo       = Memo() ## outcomes of probing moves downstream, per state of the downstream virtual task
 
 	## load
 	## --------------------------------------------------------------------
 	def load(self, task=None, triangle=None):
 		""" load the instance, build components and define the triangle """
 		name = "extended" if self.name=="icm" else "real"
+		self.memo.clear() ## the tasks are rebuilt
 		## load the task and virtual task
 		self.task = createTask(self.aps, name)
 		self.virt = createTask(self.aps, "%s_virt"%name)
 		self.reload(task, triangle)
 		## store a copy of the real task
 		self.before = self.task.copy("%s_before"%name)
-		c           = self.task.config()
-		c.name      = "%s_seen_%02d"%(name, len(self.seen)+1)
-		self.seen.append(c)
+		self.seen.add(self.task, "%s_seen_%02d"%(name, len(self.seen)+1))
 
 	## do
 	## --------------------------------------------------------------------
@@ -469,9 +587,7 @@ class ContextualModel(Component):
 		copyTaskData(self.task, self.before)
 		## build and store the configuration
 		name   = "extended" if self.name=="icm" else "real"
-		c      = self.task.config()
-		c.name = "%s_seen_%02d"%(name, len(self.seen)+1)
-		self.seen.append(c)
+		self.seen.add(self.task, "%s_seen_%02d"%(name, len(self.seen)+1))
 		## update moves
 		self.recent          = self.move
 		self.move            = None
@@ -491,17 +607,11 @@ class ContextualModel(Component):
 		kwargs = {self.name: move}
 		self.aps.cache.permanentize(**kwargs)
 
-	## seenConfig
+	## seenState
 	## --------------------------------------------------------------------
-	def seenConfig(self, nm):
-		""" checks if a given config (or NC model) has been seen before """
-		## if nothing has been seen before, false
-		if len(self.seen)==0: return False
-		## check if config has been seen before
-		for seen in self.seen:
-			if not seen.equalCustom(nm): continue
-			return True
-		return False
+	def seenState(self):
+		""" checks if the current state of the task (i.e. the current NC model) has been seen before """
+		return self.task in self.seen
 
 	## selectRandomSlots
 	## --------------------------------------------------------------------
@@ -572,84 +682,90 @@ class ICM(ContextualModel):
 
 	## buildRandomPath
 	## --------------------------------------------------------------------
-	def buildRandomPath(self, triangle, moves, allMoves, it, jt):
-		""" builds a random path of INT moves in parallel """
-
-		## basic checks
-
-		## if total maximum iterations reached, abort
-		if jt==self.aps.j["simulation"]["maxRecsIcm"]: 
-			return []
-		## if reached maximum path size, but path does not close, start over
-		if it==self.aps.j["simulation"]["maxMovesIcm"]: 
-			self.dn.virt.reload(self.task, triangle)
-			return self.buildRandomPath(triangle, [], allMoves, 0, jt+1)
-		## build moves bottom-up
-		if len(allMoves)==0:
-			return []
-
-		## checks on all moves done so far in this path
+	def buildRandomPath(self, triangle, moves, allMoves, budget):
+		""" builds a random path of INT moves in parallel, each attempt to extend the path uses the budget """
+		it = 0
+		while budget.spend():
+
+			## basic checks
+
+			## if reached maximum path size, but path does not close, start over
+			if it==self.aps.j["simulation"]["maxMovesIcm"]: 
+				self.dn.virt.reload(self.task, triangle)
+				moves = []
+				it    = 0
+				continue
+			## build moves bottom-up
+			if len(allMoves)==0:
+				return []
+
+			## checks on all moves done so far in this path
  
-		## generate the list of all objects in the triangle
-		allObjs = []
-		for slot in triangle.slots:
-			allObjs.extend(slot.holds)
-		## generate the list of all objects in the triangle that have been touched in previous moves
-		touched = getListOfObjects(moves)
-		## if all objects have been touched, the path has reached the end
-		if areEqualLists(allObjs, touched): 
-			return moves
-		## generate the list of all objects in the final configuration already (slot and layer!)
-		arefinal = getListOfFinalObjects(self.task, self.nmf)
-		## if all objects are in final position already, the path has reached the end
-		if areEqualLists(allObjs, arefinal):
-			return moves
-
-		## try adding a new move to the path
-
-		## pick a random downstream move (or create one) and a random slot that holds an object
-		slotin     = random.choice([x for x in triangle.slots if len(x.holds)>0])
-		availMoves = [x for x in allMoves if x.slotin == slotin and self.aps.applies(self.dn.virt.config(), moves[-1] if len(moves)>0 else None, x)]
-		intMove    = random.choice(availMoves) if len(availMoves)>0 else self.buildRandomPathMakeMove(0) ## try existing moves first 
-		slotout    = intMove.slotout
-		objs       = list(set(x.movable for x in dnMove.moves))
-		## if the move touches an object that has already been touched, try again (anti-circular condition)
-		touched = getListOfObjects(moves)
-		if len([x for x in objs if x in touched])>0: 
-			return self.buildRandomPath(triangle, moves, allMoves, it, jt+1)
-		## if the move touches an object in the final state configuration, try again
-		if len([x for x in objs if x in arefinal])>0: 
-			return self.buildRandomPath(triangle, moves, allMoves, it, jt+1)
-		## make a hard copy of the virtual task since slots are updated
-		before  = self.dn.virt.copy("%s_before"%self.dn.virt.name)
-		## try the move
-		res     = self.dn.probe(intMove)
-		## move did not work, try again
-		if not res: 
-			self.dn.virt.reset(before.config())
-			return self.buildRandomPath(triangle, moves, allMoves, it, jt+1)
-		## move did work, append to path
-		moves.append(intMove)
-		if intMoves in allMoves: allMoves.remove(intMove)
-		## continue to next move
-		return self.buildRandomPath(triangle, moves, allMoves, it+1, jt+1)
+			## generate the list of all objects in the triangle
+			allObjs = []
+			for slot in triangle.slots:
+				allObjs.extend(slot.holds)
+			## generate the list of all objects in the triangle that have been touched in previous moves
+			touched = getListOfObjects(moves)
+			## if all objects have been touched, the path has reached the end
+			if areEqualLists(allObjs, touched): 
+				return moves
+			## generate the list of all objects in the final configuration already (slot and layer!)
+			arefinal = getListOfFinalObjects(self.task, self.nmf)
+			## if all objects are in final position already, the path has reached the end
+			if areEqualLists(allObjs, arefinal):
+				return moves
+
+			## try adding a new move to the path
+
+			## pick a random downstream move (or create one) and a random slot that holds an object
+			slotin     = random.choice([x for x in triangle.slots if len(x.holds)>0])
+			availMoves = [x for x in allMoves if x.slotin == slotin and self.aps.applies(self.dn.virt.config(), moves[-1] if len(moves)>0 else None, x)]
+			intMove    = random.choice(availMoves) if len(availMoves)>0 else self.buildRandomPathMakeMove() ## try existing moves first 
+			## no move could be created, try again
+			if not intMove: 
+				continue
+			objs       = getListOfObjects([intMove])
+			## if the move touches an object that has already been touched, try again (anti-circular condition)
+			if len([x for x in objs if x in touched])>0: 
+				continue
+			## if the move touches an object in the final state configuration, try again
+			if len([x for x in objs if x in arefinal])>0: 
+				continue
+			## open a savepoint on the virtual task since slots are updated
+			sp      = self.dn.virt.savepoint()
+			## try the move
+			res     = self.dn.probe(intMove)
+			## move did not work, try again
+			if not res: 
+				self.dn.virt.rollback(sp)
+				continue
+			self.dn.virt.release(sp)
+			## move did work, append to path
+			moves.append(intMove)
+			if intMove in allMoves: allMoves.remove(intMove)
+			## continue to next move
+			it += 1
+		## if total maximum iterations reached, abort
+		return []
 
 	## buildRandomPathMakeMove
 	## --------------------------------------------------------------------
-	def buildRandomPathMakeMove(self, kt):
+	def buildRandomPathMakeMove(self):
 		""" trying a move when building a random path of INT moves """
+		budget = Budget(self.aps.j["simulation"]["maxRecsIcm"])
+		while budget.spend():
+			## generate a new INT strategy by running INT's selectStrategy method
+			self.dn.selectStrategy()
+			## if no move has been generated, try again
+			if not self.dn.move: continue
+			## capture move that has been created
+			intMove = self.dn.move
+			self.dn.move   = None
+			self.dn.priors = []
+			return intMove
 		## if total maximum iterations reached, abort
-		if kt==self.aps.j["simulation"]["maxRecsIcm"]: 
-			return None
-		## generate a new INT strategy by running INT's selectStrategy method
-		self.dn.selectStrategy()
-		## if no move has been generated, try again
-		if not self.dn.move: return self.buildRandomPathMakeMove(kt+1)
-		## capture move that has been created
-		intMove = self.dn.move
-		self.dn.move   = None
-		self.dn.priors = []
-		return intMove
+		return None
 
 	## createStrategy
 	## --------------------------------------------------------------------
@@ -675,7 +791,7 @@ class ICM(ContextualModel):
 		## we have at least one INT move, the gradient is not zero (objects on pins are different), and the new configuration 
 		## has not been seen before (includes the hand) -> close the ICM and propagate upstream
 		## N.B.: it is NOT gradient>0, so we do NOT force the CM to proceed linearly towards the final state!
-		if len(self.posteriors)>0 and self.gradient!=0 and not self.seenConfig(self.nmc):
+		if len(self.posteriors)>0 and self.gradient!=0 and not self.seenState():
 			self.storeStrategy()
 			return False
 		## check length of moves and truncate if necessary
@@ -687,7 +803,7 @@ class ICM(ContextualModel):
 			self.truncateStrategy(True)
 			self.deadEnd   = True
 			self.numTruncs = 0
-			self.seen      = []
+			self.seen.clear()
 			return False
 		## all checks passed, so processing can continue downstream, but INT diverged from top-down, so reassess the strategy (beginning of next iteration)
 		## dead end (INT and LCT could not find meaningful strategies in maxTruncsInt attempts) -> propagate upstream
@@ -695,7 +811,7 @@ class ICM(ContextualModel):
 			self.truncateStrategy(True)
 			self.deadEnd   = True
 			self.numTruncs = 0
-			self.seen      = []
+			self.seen.clear()
 			return False
 		## restart the ICM move in the next iteration (reassess strategy) 
 		self.truncateStrategy()
@@ -723,14 +839,28 @@ class ICM(ContextualModel):
 		## probe a given strategy of downstream moves
 		for move in topDownStrat.moves:
 			self.dn.virt.reload(self.virt, move.tensoral)
-			for intMove in move.conceptual:
-				res = self.dn.probe(intMove)
-				if not res: return False
+			if not self.replay(move): return False
 		return True
 
+	## replay
+	## --------------------------------------------------------------------
+	def replay(self, move):
+		""" probes the INT moves of an ICM move on the virtual task of the INT (reloaded for the triangle of the move), returns True if all of them work;
+		    apart from blocked INT moves, the outcome only depends on the state of that task, so it is memoized (by its state hash) together with the resulting state """
+		if any(x in self.dn.blockedMoves for x in move.conceptual): return False
+		key   = (self.dn.virt.stateHash, move.key())
+		entry = self.memo.get(key)
+		if entry:
+			res, after = entry
+			self.dn.virt.restore(after)
+			return res
+		res = all(self.dn.replay(x) for x in move.conceptual)
+		self.memo.put(key, (res, self.dn.virt.stateKey()))
+		return res
+
 	## selectStrategy
 	## --------------------------------------------------------------------
-	def selectStrategy(self, topDownStrat=None, it=0):
+	def selectStrategy(self, topDownStrat=None):
 		""" updates the internal condition of the ICM by selecting a strategy and a triangle, i.e. does ICM action """
 		## strategy forced top-down
 		if topDownStrat: 
@@ -746,48 +876,46 @@ class ICM(ContextualModel):
 		## if we're still having priors to work off, do that
 		if len(self.priors)>0:
 			return
+		budget = Budget(self.aps.j["simulation"]["maxRecsIcm"])
+		while budget.spend():
+			## if previous iteration has not worked, strategy has been closed already by the internal interface,
+			## and now we create and try a new strategy, i.e., a new ThreefoldWay object
+			## inserted randomness: not necessarily proceed with a known ICM move, but try to create a new one
+			choice = npchoice([0,1], 1, p=[self.aps.j["simulation"]["probRedoIcm"], 1-self.aps.j["simulation"]["probRedoIcm"]])
+			if choice==0: 
+				if self.selectStrategyNewMove(): return
+				continue
+			## first, try to find an applicable strategy from long-term memory, try it out in the virtual task instance
+			## (only the moves whose triangle lies within the triangle of the ICM are considered, in the order of their score)
+			ids = self.triangle.slotIds()
+			for move in self.allMoves.sortedIn([x for x in self.allMoves.buckets if x <= ids]):
+				if not self.aps.applies(self.task.config(), self.recent, move): continue ## ignore inapplicable moves
+				self.dn.virt.reload(self.task, move.tensoral)
+				if not self.replay(move): continue
+				self.move   = move
+				self.priors = move.conceptual[:]
+				return
+			## second, generate a new random strategy
+			if self.selectStrategyNewMove(): return
 		## if total maximum iterations reached, abort, sacrificing an iteration
-		if it==self.aps.j["simulation"]["maxRecsIcm"]: 
-			self.move   = None
-			self.priors = []
-			return
-		## if previous iteration has not worked, strategy has been closed already by the internal interface,
-		## and now we create and try a new strategy, i.e., a new ThreefoldWay object
-		## inserted randomness: not necessarily proceed with a known ICM move, but try to create a new one
-		choice = npchoice([0,1], 1, p=[self.aps.j["simulation"]["probRedoIcm"], 1-self.aps.j["simulation"]["probRedoIcm"]])
-		if choice==0: 
-			return self.selectStrategyNewMove(it)
-		## first, try to find an applicable strategy from long-term memory, try it out in the virtual task instance
-		for move in sorted(self.allMoves, key=lambda x: x.score):
-			if not self.aps.applies(self.task.config(), self.recent, move): continue ## ignore inapplicable moves
-			res = True
-			if len([x for x in move.tensoral.slots if x in self.triangle.slots])!=len(move.tensoral.slots): continue
-			self.dn.virt.reload(self.task, move.tensoral)
-			for i,intMove in enumerate(move.conceptual):
-				res = self.dn.probe(intMove)
-				if not res: break
-			if not res: continue
-			self.move   = move
-			self.priors = move.conceptual[:]
-			return
-		## second, generate a new random strategy
-		return self.selectStrategyNewMove(it)
+		self.move   = None
+		self.priors = []
 
 	## selectStrategyNewMove
 	## --------------------------------------------------------------------
-	def selectStrategyNewMove(self, it):
-		""" generates a new strategy randomly """
+	def selectStrategyNewMove(self):
+		""" generates a new strategy randomly, returns False if the selection needs to be tried again """
 		## generate a new random strategy
 		randomSlots = self.selectRandomSlots() 
 		name        = "tri_%03d"%(len(self.aps.allTriangles)+1)
 		triangle    = self.aps.createTriangle(self.task, name, randomSlots)
 		self.dn.virt.reload(self.task, triangle)		
-		moves       = self.buildRandomPath(triangle, [], list(self.dn.allMoves), 0, 0)
+		moves       = self.buildRandomPath(triangle, [], list(self.dn.allMoves), Budget(self.aps.j["simulation"]["maxRecsIcm"]))
 		## if not found a proper path (probably not enough downstream strategies) -> run downstream in bottom-up mode
 		if len(moves)==0: 
 			self.move   = None
 			self.priors = []
-			return
+			return True
 		## if found a proper path -> run downstream in top-down mode
 		name        = "icm_%03d"%(len(self.allMoves)+1)
 		move        = ThreefoldWay(self, name, triangle, moves, [])
@@ -795,10 +923,11 @@ class ICM(ContextualModel):
 		move        = exmove if exmove else move ## if path already exists, take the existing one
 		## if this sequence of moves is not applicable, try again
 		if not self.aps.applies(self.task.config(), self.recent, move): 
-			return self.selectStrategy(it+1)
+			return False
 		## use this new move
 		self.move   = move
 		self.priors = moves[:]
+		return True
 
 	## storeStrategy
 	## --------------------------------------------------------------------
@@ -826,7 +955,7 @@ class ICM(ContextualModel):
 		## truncate strategy
 		super(ICM, self).truncateStrategy(hardReload)
 		## revert last move at INT (task and before are taken care of by top-down call of reload)
-		self.dn.recentMoves = self.dn.recentMoves[:-1]
+		self.dn.recentMoves.pop()
 		self.dn.recent      = self.dn.recentMoves[-1] if len(self.dn.recentMoves)>0 else None
 		self.dn.move        = None
 
@@ -913,6 +1042,19 @@ class SCM(ContextualModel):
 		## FIXME: triangular exchange is not implemented in this version of the algo
 		return False
 
+	## replay
+	## --------------------------------------------------------------------
+	def replay(self, move):
+		""" probes an SCM move via the ICM on its virtual task (reloaded for the input config of the move), returns True if it works;
+		    apart from blocked INT moves, the outcome only depends on the state of that task, so it is memoized (by its state hash) """
+		if any(x in self.dn.dn.blockedMoves for tw in move.moves for x in tw.conceptual): return False
+		key = (self.dn.virt.stateHash, move.key())
+		res = self.memo.get(key)
+		if res is None:
+			res = self.dn.probe(move)
+			self.memo.put(key, res)
+		return res
+
 	## selectStrategy
 	## --------------------------------------------------------------------
 	def selectStrategy(self, topDownStrat=None):
@@ -933,10 +1075,9 @@ class SCM(ContextualModel):
 		## first, try to find an applicable strategy from long-term memory, try it out in the virtual task instance
 		for move in sorted(self.allMoves, key=lambda x: x.score):
 			if not self.aps.applies(self.task.config(), self.recent, move): continue ## ignore inapplicable moves
-			res = True
 			if move.confin != self.task.config(): continue
 			self.dn.virt.reload(self.task, move.confin)
-			if not self.dn.probe(move): continue
+			if not self.replay(move): continue
 			self.move   = move
 			self.priors = move.moves[:]
 			return
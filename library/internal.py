@@ -1,12 +1,14 @@
 import collections
 import math
-import more_itertools
 import random
 from numpy.random import choice as npchoice
 
+from library.budget    import Budget
 from library.component import Component
 from library.exterior  import Task, createTask, copyTaskData
 from library.external  import StrategyLct
+from library.functions import reducePath
+from library.memo      import Memo
 from library.ic        import buildTriangleFromTask
 
 
@@ -28,53 +30,137 @@ def areConsecutiveMoves(prevMove, thisMove):
 	## both moves are object-based moves
 	return prevMove.slotout == thisMove.slotin and prevMove.movable == thisMove.movable
 
-## findMovePattern
+## mergeLctMoves
 ## ------------------------------------------------------------------------
-def findMovePattern(moves, minLen=2):
-	""" finds a repeating pattern of moves """
-	maxLen = math.ceil(float(len(moves))/2)
-	for size in range(minLen,maxLen+1):
-		windows = [
-			tuple(window)
-			for window in more_itertools.windowed(moves, size)
-		]
-		counter = collections.Counter(windows)
-		for window, count in counter.items():
-			if count==1: continue
-			return window
-	return None
+def mergeLctMoves(lct, window):
+	""" merges a window of four LCT moves into one if they are consecutive and futile, returns None if they cannot be merged """
+	first  = window[0]
+	second = window[1]
+	third  = window[2]
+	fourth = window[3]
+	## check if moves can be merged
+	if first.handle.modulate=="object" or first.movable != fourth.movable or first.handle != fourth.handle or second.slotout != third.slotin: 
+		return None
+	## merge last into first
+	name     = "lct_%03d"%(len(lct.allMoves)+1)
+	strategy = StrategyLct(lct.aps, name, first.handle, first.slotin, first.movable, fourth.slotout)
+	exmove   = lct.findMove(strategy)
+	if not exmove: lct.aps.cache.permanentize(lct=strategy)
+	return [exmove if exmove else strategy]
 
 ## reduceLctMoves
 ## ------------------------------------------------------------------------
 def reduceLctMoves(lct, moves):
 	""" reduces a path of LCT moves in case a pattern of four moves are consecutive and futile """
-	## need to have at least four moves in the path
-	if len(moves)<4: return moves
-	## build windows of size 4
-	windows = [
-		tuple(window)
-		for window in more_itertools.windowed(moves, 4)
-	]
-	## loop through windows, checking whether or not to combine moves
-	for i,window in enumerate(windows):
-		first  = window[0]
-		second = window[1]
-		third  = window[2]
-		fourth = window[3]
-		## check if moves can be merged, if not, continue to next window
-		if first.handle.modulate=="object" or first.movable != fourth.movable or first.handle != fourth.handle or second.slotout != third.slotin: 
-			continue
-		## merge last into first and remove from list
-		name     = "lct_%03d"%(len(lct.allMoves)+1)
-		strategy = StrategyLct(lct.aps, name, first.handle, first.slotin, first.movable, fourth.slotout)
-		exmove   = lct.findMove(strategy)
-		if not exmove: lct.aps.cache.permanentize(lct=strategy)
-		move     = exmove if exmove else strategy
-		## restart with merged set of moves
-		newmoves = moves[0:i] + [move] + moves[i+4:]
-		return reduceLctMoves(lct, newmoves)
-	## the loop finishes only when no moves could be combined anymore, so return the list of moves
-	return moves
+	return reducePath(moves, 4, lambda window: mergeLctMoves(lct, window))
+
+
+
+
+## MoveHistory
+## ========================================================================
+class MoveHistory:
+	""" list of the moves carried out, detecting repeating patterns of moves incrementally """
+
+	## __init__
+	## --------------------------------------------------------------------
+	def __init__(self, size=2):
+		""" constructor """
+		self.size    = size ## minimum number of moves in a repeating pattern
+		self.moves   = []   ## the moves kept, in the order they were carried out
+		self.dropped = 0    ## number of moves dropped from the front (the indices of the others count them)
+		self.windows = {}   ## indices of the occurrences of each window of move names
+		self.start   = -1   ## index of the first occurrence of the earliest repeated window
+
+	## __getitem__
+	## --------------------------------------------------------------------
+	def __getitem__(self, idx):
+		""" returns the move at the given index (negative ones count from the end) """
+		return self.moves[idx-self.dropped if idx>=0 else idx]
+
+	## __iter__
+	## --------------------------------------------------------------------
+	def __iter__(self):
+		""" iterator """
+		return iter(self.moves)
+
+	## __len__
+	## --------------------------------------------------------------------
+	def __len__(self):
+		""" length """
+		return len(self.moves)
+
+	## append
+	## --------------------------------------------------------------------
+	def append(self, move):
+		""" adds a move and registers the window of moves it closes """
+		self.moves.append(move)
+		if len(self.moves)<self.size: return
+		occs = self.windows.setdefault(self.window(len(self.moves)-self.size), collections.deque())
+		occs.append(self.dropped+len(self.moves)-self.size)
+		## repeated window: the loop starts at its first occurrence (the earliest one wins)
+		if len(occs)>1 and (self.start<0 or occs[0]<self.start): 
+			self.start = occs[0]
+
+	## drop
+	## --------------------------------------------------------------------
+	def drop(self):
+		""" removes the first move (if any), the indices of the others are kept """
+		if len(self.moves)==0: return
+		if len(self.moves)>=self.size:
+			window = self.window(0)
+			self.windows[window].popleft()
+			if len(self.windows[window])==0: del self.windows[window]
+			if self.start==self.dropped: self.start = self.firstRepeated()
+		del self.moves[0]
+		self.dropped += 1
+
+	## firstRepeated
+	## --------------------------------------------------------------------
+	def firstRepeated(self):
+		""" returns the index of the first occurrence of the earliest repeated window (-1 if there is none) """
+		return min([x[0] for x in self.windows.values() if len(x)>1] or [-1])
+
+	## get
+	## --------------------------------------------------------------------
+	def get(self, idx):
+		""" returns the move at the given index, None if it is not kept (dropped or not done yet) """
+		if idx<self.dropped or idx>=self.dropped+len(self.moves): return None
+		return self.moves[idx-self.dropped]
+
+	## loopStart
+	## --------------------------------------------------------------------
+	def loopStart(self):
+		""" returns the index of the first move of a repeating pattern (-1 if there is none) """
+		## patterns are only probed if they fit at most twice into the history
+		if self.size > math.ceil(float(len(self.moves))/2): return -1
+		return self.start
+
+	## pop
+	## --------------------------------------------------------------------
+	def pop(self):
+		""" removes the last move (if any) """
+		if len(self.moves)==0: return
+		if len(self.moves)>=self.size:
+			window = self.window(len(self.moves)-self.size)
+			occs   = self.windows[window]
+			occs.pop()
+			if   len(occs)==0: del self.windows[window]
+			elif len(occs)==1 and self.start==occs[0]: self.start = self.firstRepeated()
+		self.moves.pop()
+
+	## truncate
+	## --------------------------------------------------------------------
+	def truncate(self, length):
+		""" removes all moves after the first length ones (counting the dropped ones) """
+		while len(self.moves)>0 and self.dropped+len(self.moves)>length:
+			self.pop()
+
+	## window
+	## --------------------------------------------------------------------
+	def window(self, i):
+		""" returns the names of the moves in the window starting at the i-th move kept """
+		return tuple(x.name for x in self.moves[i:i+self.size])
 
 
 
@@ -96,16 +182,28 @@ class StrategyInt:
 		self.moves     = moves
 		self.slotout   = slotout
 		self.score     = len(moves) if moves else 0
+		self.skey      = None ## structural key  (computed once, the move is not modified after construction)
+		self.shash     = None ## structural hash (computed once, from the structural key)
 		if fromDict: self.read(fromDict)
 
 	## __eq__
 	## --------------------------------------------------------------------
 	def __eq__(self, other):
 		""" tests if this StrategyInt object is the same as another StrategyInt object """
+		if self is other: return True
+		if type(other)!=type(self): return False
+		if hash(self)!=hash(other): return False
 		if len(self.moves)!=len(other.moves): return False
 		for i,move in enumerate(self.moves):
 			if move != other.moves[i]: return False
-		return self.slotin.name==other.slotin.name and self.slotout.name==other.slotout.name
+		return self.slotin.id==other.slotin.id and self.slotout.id==other.slotout.id
+
+	## __hash__
+	## --------------------------------------------------------------------
+	def __hash__(self):
+		""" hash of the move, consistent with __eq__ """
+		if self.shash is None: self.shash = hash(self.key())
+		return self.shash
 
 	## __neq__
 	## --------------------------------------------------------------------
@@ -119,6 +217,19 @@ class StrategyInt:
 		""" dumps the content of this object to screen (for debugging) """
 		return "StrategyInt (%s, %s, %s, %s)"%(self.name, self.slotin.name, ",".join([x.name for x in self.moves]), self.slotout.name)
 
+	## bucket
+	## --------------------------------------------------------------------
+	def bucket(self):
+		""" returns the bucket of this move in collections, i.e. the id of the slot its first LCT move starts at """
+		return self.moves[0].slotin.id
+
+	## key
+	## --------------------------------------------------------------------
+	def key(self):
+		""" returns the hashable key identifying this move (input slot, keys of the LCT moves, output slot) """
+		if self.skey is None: self.skey = (self.slotin.id, tuple(x.key() for x in self.moves), self.slotout.id)
+		return self.skey
+
 	## merge
 	## --------------------------------------------------------------------
 	def merge(self, other):
@@ -165,17 +276,19 @@ class InternalInterface(Component):
 		self.fnmf         = None     ## link to Config of desired final state FNM
 		self.virt         = None     ## link to virtual task
 		self.gradient     = 0        ## metric distance of last change of last move
-		self.recentMoves  = []       ## history of the last moves
+		self.recentMoves  = MoveHistory() ## history of the last moves (dropped together with their states in history)
 		self.priors       = []       ## planned LCT moves
 		self.posteriors   = []       ## done    LCT moves
 		self.before       = None     ## copy of the task before all moves
-		self.history      = []       ## history of last "before" tasks
+		self.history      = []       ## history of last "before" states (as Configs, at most maxHistory)
+		self.dropped      = 0        ## number of states dropped from the front of the history
 		self.blockedMoves = []       ## list of INT moves blocked top-down
 		self.genMoves     = []       ## list of all moves generated (only for buildRandomPath, no full INT moves yet)
 		self.numTruncs    = 0        ## number of truncations
 		self.deadEnd      = False    ## true if the interface has encountered a dead end
 		self.isFinal      = False    ## true if the final state has been reached
 		self.foundGoodOne = False
+		self.memo         = Memo()   ## outcomes of replaying INT moves on the virtual task, per state
 
 	## load
 	## --------------------------------------------------------------------
@@ -188,9 +301,11 @@ class InternalInterface(Component):
 		## store a copy of the real task
 		self.before = self.task.copy("external_before")
 		## reset containers
-		self.recentMoves  = []
+		self.recentMoves  = MoveHistory(self.aps.j["simulation"]["sizePattern"])
 		self.history      = []
+		self.dropped      = 0
 		self.blockedMoves = []
+		self.memo.clear() ## the virtual task has been rebuilt
 
 	## reload
 	## --------------------------------------------------------------------
@@ -210,70 +325,77 @@ class InternalInterface(Component):
 
 	## buildRandomPath
 	## --------------------------------------------------------------------
-	def buildRandomPath(self, moves, allMoves, it, jt):
-		""" builds a random path of consecutive LCT moves """
+	def buildRandomPath(self, moves, allMoves, budget):
+		""" builds a random path of consecutive LCT moves, each attempt to extend the path uses the budget """
+		it = 0
+		while budget.spend():
+			## if reached maximum path size, but path does not close, start over
+			if it==self.aps.j["simulation"]["maxMovesInt"]: 
+				self.virt.reset(self.fnmc)
+				moves = []
+				it    = 0
+				continue
+			## inserted randomness: not necessarily proceed with a known LCT move, but try to create a new one
+			## (also build the LCT move bottom-up if there are no moves)
+			lctMove = None
+			choice  = random.choice([0,1])
+			if choice==1 and len(allMoves)>0:
+				## pick a random LCT move
+				availMoves = [x for x in allMoves if x not in self.lct.blockedMoves]
+				## no moves available -> start over or go in bottom-up if no moves available from start
+				if len(availMoves)==0:
+					if len(moves)==0: return []
+					moves = []
+					it    = 0
+					continue
+				## pick random LCT move
+				lctMove = random.choice(availMoves)
+				## if we have "move" handles consecutively, try again
+				if len(moves)>0 and not lctMove.handle.modulate=="object" and not moves[-1].handle.modulate=="object":
+					continue
+				## check if move is consecutive (output slot of previous move is equal to input slot of this move); if not, try again
+				prev = moves[-1] if len(moves)>0 else None
+				if not areConsecutiveMoves(prev, lctMove):
+					continue
+			## try the move or find an alternative one, if it did not work, try again
+			lctMove = self.buildRandomPathTryMove(lctMove)
+			if not lctMove: continue
+			## append to path
+			moves.append(lctMove)
+			if lctMove in allMoves: 
+				allMoves.remove(lctMove) ## remove move from container to avoid going in cricles
+			## if path has not yet reached the end, continue
+			if lctMove.slotout.type.name!="pin":
+				it += 1
+				continue
+			## if path reached the end, but has been generated before, start over
+			## N.B. this is NOT recentMoves, cause genMoves applies only for a single call of selectStrategy
+			if moves in self.genMoves: 
+				moves = []
+				it    = 0
+				continue
+			## path is good, return
+			self.genMoves.append(moves)
+			return moves
 		## if total maximum iterations reached, abort
-		if jt==self.aps.j["simulation"]["maxRecsInt"]: 
-			return []
-		## if reached maximum path size, but path does not close, start over
-		if it==self.aps.j["simulation"]["maxMovesInt"]: 
-			self.virt.reset(self.fnmc)
-			return self.buildRandomPath([], allMoves, 0, jt+1)
-		## inserted randomness: not necessarily proceed with a known LCT move, but try to create a new one
-		choice = random.choice([0,1])
-		if choice==0: 
-			return self.buildRandomPathTryMove(moves, allMoves, it, jt, None)
-		## build LCT move bottom-up
-		if len(allMoves)==0:
-			return self.buildRandomPathTryMove(moves, allMoves, it, jt, None)
-		## pick a random LCT move
-		availMoves = [x for x in allMoves if x not in self.lct.blockedMoves]
-		## no moves available -> start over or go in bottom-up if no moves available from start
-		if len(availMoves)==0:
-			if len(moves)==0: return []
-			return self.buildRandomPath([], allMoves, 0, jt+1)
-		## pick random LCT move
-		lctMove = random.choice(availMoves)
-		## if we have "move" handles consecutively, try again
-		if len(moves)>0 and not lctMove.handle.modulate=="object" and not moves[-1].handle.modulate=="object":
-			return self.buildRandomPath(moves, allMoves, it, jt+1)
-		## get strategy details
-		prev    = moves[-1] if len(moves)>0 else None
-		thisin  = lctMove.movable.slot
-		## check if move is consecutive (output slot of previous move is equal to input slot of this move); if not, try again
-		if not areConsecutiveMoves(prev, lctMove):
-			return self.buildRandomPath(moves, allMoves, it, jt+1)
-		## try the move or find an alternative one
-		return self.buildRandomPathTryMove(moves, allMoves, it, jt, lctMove)
+		return []
 
 	## buildRandomPathTryMove
 	## --------------------------------------------------------------------
-	def buildRandomPathTryMove(self, moves, allMoves, it, jt, lctMove):
-		""" trying a move when building a random path of consecutive LCT moves """
-		## make a hard copy of the virtual task since slots are updated
-		before  = self.virt.copy("externalvirt_before")
+	def buildRandomPathTryMove(self, lctMove):
+		""" trying a move when building a random path of consecutive LCT moves, returns the LCT move carried out (None if it did not work) """
+		## open a savepoint on the virtual task since slots are updated
+		sp      = self.virt.savepoint()
 		## try the move (or find an alternative one)
 		res     = self.lct.do(lctMove, self.virt, True if lctMove else False)
-		## move did not work, try again
+		## move did not work
 		if not res: 
-			self.virt.reset(before.config())
-			return self.buildRandomPath(moves, allMoves, it, jt+1)
-		## retrieve LCT move carried out, append to path
+			self.virt.rollback(sp)
+			return None
+		self.virt.release(sp)
+		## retrieve LCT move carried out
 		## N.B. this if clause is necessary because in probe mode (if lctMove is given), LCT does not update its recent move
-		lctMove = self.lct.recent if not lctMove else lctMove
-		moves.append(lctMove)
-		if lctMove in allMoves: 
-			allMoves.remove(lctMove) ## remove move from container to avoid going in cricles
-		## if path has not yet reached the end, continue
-		if lctMove.slotout.type.name!="pin":
-			return self.buildRandomPath(moves, allMoves, it+1, jt+1)
-		## if path reached the end, but has been generated before, start over
-		## N.B. this is NOT recentMoves, cause genMoves applies only for a single call of selectStrategy
-		if moves in self.genMoves: 
-			return self.buildRandomPath([], allMoves, 0, jt+1)
-		## path is good, return
-		self.genMoves.append(moves)
-		return moves
+		return self.lct.recent if not lctMove else lctMove
 
 	## createStrategy
 	## --------------------------------------------------------------------
@@ -346,7 +468,7 @@ class InternalInterface(Component):
 				return False
 		## if a loop is present -> truncate and continue
 		## N.B. this is done regardless of the ICM strategies; we book-keep recentMoves potentially accross multiple ICM strategies
-		idxMove = self.startsLoop(self.aps.j["simulation"]["sizePattern"])
+		idxMove = self.startsLoop()
 		if idxMove>-1: 
 			self.truncateStrategy(idxMove)
 			return True
@@ -374,16 +496,23 @@ class InternalInterface(Component):
 	def finishMove(self):
 		""" finish the move by resetting buffers and keeping track of the evolving task """
 		## keep track of the previous state before that move
-		self.history.append(self.before.copy("external_history_%03d"%(len(self.history)+1)))
+		self.history.append(self.before.config())
 		## keep track of the move
 		self.recentMoves.append(self.move)
+		## only keep the most recent states and the moves done from them (no limit if maxHistory is not given)
+		maxHistory = self.aps.j["simulation"].get("maxHistory")
+		if maxHistory is not None and len(self.history)>maxHistory:
+			del self.history[0]
+			self.dropped += 1
+		while self.recentMoves.dropped<self.dropped:
+			self.recentMoves.drop()
 		## update internal state
 		copyTaskData(self.task, self.before)
 		self.recent           = self.move
 		self.move             = None
 		self.priors           = []
 		self.posteriors       = []
-		self.lct.blockedMoves = []
+		self.lct.blockedMoves.clear()
 		self.foundGoodOne     = True
 
 	## optimizeStrategy
@@ -398,10 +527,22 @@ class InternalInterface(Component):
 	def probe(self, topDownStrat):
 		""" tests a given top-down strategy downstream completely; self.virt needs to have been set properly """
 		if topDownStrat in self.blockedMoves: return False
-		for move in topDownStrat.moves:
-			res = self.lct.do(move, self.virt, True)
-			if not res: return False
-		return True
+		return self.replay(topDownStrat)
+
+	## replay
+	## --------------------------------------------------------------------
+	def replay(self, move):
+		""" applies the LCT moves of an INT move to the virtual task, keeping the ones that work, returns True if all of them work;
+		    the outcome only depends on the state of the virtual task, so it is memoized (by its state hash) together with the resulting state """
+		key   = (self.virt.stateHash, move.key())
+		entry = self.memo.get(key)
+		if entry:
+			res, after = entry
+			self.virt.restore(after)
+			return res
+		res = self.lct.ext.run(self.virt, move.moves, True) == len(move.moves)
+		self.memo.put(key, (res, self.virt.stateKey()))
+		return res
 
 	## saveStrategy
 	## --------------------------------------------------------------------
@@ -414,7 +555,7 @@ class InternalInterface(Component):
 
 	## selectStrategy
 	## --------------------------------------------------------------------
-	def selectStrategy(self, topDownStrat=None, it=0):
+	def selectStrategy(self, topDownStrat=None):
 		""" selects a path and triangle (= IC streak), i.e. does NC action """
 		## strategy forced top-down
 		if topDownStrat: 
@@ -423,56 +564,60 @@ class InternalInterface(Component):
 			self.priors     = self.move.moves[:]
 			self.posteriors = []
 			return
+		budget = Budget(self.aps.j["simulation"]["maxRecsInt"])
+		while budget.spend():
+			## we already have a strategy
+			if len(self.priors)>0: 
+				return 
+			## if LCT does not know any moves, run LCT in bottom-up
+			if len(self.lct.allMoves)==0:
+				self.move   = None
+				self.priors = []
+				return
+			## inserted randomness: not necessarily proceed with a known LCT move, but try to create a new one
+			choice = npchoice([0,1], 1, p=[self.aps.j["simulation"]["probRedoInt"], 1-self.aps.j["simulation"]["probRedoInt"]])
+			if choice==0: 
+				if self.selectStrategyNewMove(): return
+				continue
+			## analyze the current configuration, find ANY slot that is filled
+			slotin = self.task.findFilledSlot()
+			if not slotin: return
+			## first, try to find an applicable strategy from long-term memory, try it out in the virtual task instance
+			## (the virtual task is reset once, each probe is undone by rolling back to the savepoint)
+			sp = None
+			## (only the moves starting at that slot are considered, in the order of their score)
+			for move in self.allMoves.sortedIn([slotin.id]):
+				if not self.aps.applies(self.task.config(), self.recent, move): continue ## ignore inapplicable moves
+				if move in self.blockedMoves                                  : continue ## ignore moves blocked top-down
+				if sp: self.virt.rollback(sp)
+				else : self.virt.reset(self.fnmc)
+				sp  = self.virt.savepoint()
+				res = self.replay(move)
+				if not res: continue
+				self.virt.release(sp)
+				self.move   = move
+				self.priors = move.moves[:]
+				return
+			if sp: self.virt.release(sp)
+			## second, generate a new random path of LCT strategies
+			if self.selectStrategyNewMove(): return
 		## if total maximum iterations reached, abort, sacrificing an iteration
-		if it==self.aps.j["simulation"]["maxRecsInt"]: 
-			self.move   = None
-			self.priors = []
-			return
-		## we already have a strategy
-		if len(self.priors)>0: 
-			return 
-		## if LCT does not know any moves, run LCT in bottom-up
-		if len(self.lct.allMoves)==0:
-			self.move   = None
-			self.priors = []
-			return
-		## inserted randomness: not necessarily proceed with a known LCT move, but try to create a new one
-		choice = npchoice([0,1], 1, p=[self.aps.j["simulation"]["probRedoInt"], 1-self.aps.j["simulation"]["probRedoInt"]])
-		if choice==0: 
-			return self.selectStrategyNewMove(it)
-		## analyze the current configuration, find ANY slot that is filled
-		slotin = self.task.findFilledSlot()
-		if not slotin: return
-		## first, try to find an applicable strategy from long-term memory, try it out in the virtual task instance
-		for move in sorted(self.allMoves, key=lambda x: x.score):
-			if not self.aps.applies(self.task.config(), self.recent, move): continue ## ignore inapplicable moves
-			if move in self.blockedMoves                                  : continue ## ignore moves blocked top-down
-			res = True
-			if slotin != move.moves[0].slotin: continue
-			self.virt.reset(self.fnmc)
-			for lctMove in move.moves:
-				res = self.lct.do(lctMove, self.virt, True)
-				if not res: break
-			if not res: continue
-			self.move   = move
-			self.priors = move.moves[:]
-			return
-		## second, generate a new random path of LCT strategies
-		return self.selectStrategyNewMove(it)
+		self.move   = None
+		self.priors = []
 
 	## selectStrategyNewMove
 	## --------------------------------------------------------------------
-	def selectStrategyNewMove(self, it):
-		""" generates a new strategy randomly """
+	def selectStrategyNewMove(self):
+		""" generates a new strategy randomly, returns False if the selection needs to be tried again """
 		## generate a new random path of LCT strategies
 		self.virt.reset(self.fnmc)
 		self.genMoves = []
-		moves = self.buildRandomPath([], list(self.lct.allMoves)[:], 0, 0)
+		moves = self.buildRandomPath([], list(self.lct.allMoves)[:], Budget(self.aps.j["simulation"]["maxRecsInt"]))
 		## if not found a proper path (probably not enough LCT strategies) -> run LCT in bottom-up mode
 		if len(moves)==0: 
 			self.move   = None
 			self.priors = []
-			return
+			return True
 		## if found a proper path -> run LCT in top-down mode
 		slotin      = moves[ 0].slotin
 		slotout     = moves[-1].slotout
@@ -482,25 +627,17 @@ class InternalInterface(Component):
 		move        = exmove if exmove else move ## if path already exists, take the existing one
 		## if this sequence of moves is not applicable, try again
 		if not self.aps.applies(self.task.config(), self.recent, move) or move in self.blockedMoves: 
-			return self.selectStrategy(it=it+1)
+			return False
 		## set the path and priors
 		self.move   = move 
 		self.priors = self.move.moves[:]
+		return True
 
 	## startsLoop
 	## --------------------------------------------------------------------
-	def startsLoop(self, minLen=2):
+	def startsLoop(self):
 		""" returns the move, that started a loop, if any """
-		## find a repeating pattern of moves (as a tuple of move names)
-		moves   = [x.name for x in self.recentMoves]
-		pattern = findMovePattern(moves, minLen)
-		if not pattern: return -1
-		## find the first occurence of that pattern and return the index of the first move
-		lmd = lambda data, pos, size: data[pos: pos + size] 
-		for i in range(len(moves)+len(pattern)+1):
-			p = lmd(moves, i, len(pattern))
-			if all(p[j]==pattern[j] for j in range(len(p))): return i
-		return -1
+		return self.recentMoves.loopStart()
 
 	## storeStrategy
 	## --------------------------------------------------------------------
@@ -529,7 +666,7 @@ class InternalInterface(Component):
 		copyTaskData(self.before, self.task)
 		self.lct.blockedMoves.append(self.posteriors[0])
 		## reset recent moves to before that move
-		self.recentMoves = self.recentMoves[:-1]
+		self.recentMoves.pop()
 		self.recent      = self.recentMoves[-1] if len(self.recentMoves)>0 else None
 		## reset moves
 		self.move        = None
@@ -541,14 +678,19 @@ class InternalInterface(Component):
 	## --------------------------------------------------------------------
 	def truncateStrategyToMove(self, idxToRevertTo):
 		""" reverts all moves until BEFORE a given move """
+		## the state before that move needs to be kept (the moves are dropped together with their states, so this is the case for a loop start)
+		if idxToRevertTo<self.dropped:
+			self.log("used", "skipped revert", idxToRevertTo)
+			return
 		## learn that that INT move does not apply for that condition
-		self.aps.learn(self.task.config(), self.recentMoves[idxToRevertTo-1] if idxToRevertTo>0 else None, self.recentMoves[idxToRevertTo], False)
+		self.aps.learn(self.task.config(), self.recentMoves.get(idxToRevertTo-1), self.recentMoves[idxToRevertTo], False)
 		## reset task to previous instance
-		copyTaskData(self.history[idxToRevertTo], self.task  )
-		copyTaskData(self.history[idxToRevertTo], self.before)
+		state            = self.history[idxToRevertTo-self.dropped]
+		self.task  .recover(self.aps.task, state)
+		self.before.recover(self.aps.task, state)
 		## reset containers to before that move
-		self.history     = self.history    [:idxToRevertTo]
-		self.recentMoves = self.recentMoves[:idxToRevertTo]
+		self.history     = self.history[:idxToRevertTo-self.dropped]
+		self.recentMoves.truncate(idxToRevertTo)
 		self.recent      = self.recentMoves[-1] if len(self.recentMoves)>0 else None
 		## reset moves
 		self.move        = None
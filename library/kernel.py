@@ -2,12 +2,12 @@ import json
 import os
 
 from library.cache     import Cache
-from library.condition import Condition
+from library.condition import Condition, strategyKey
 from library.control   import Control
 from library.functions import mkdir, readJson
 from library.exterior  import Config, Task, Exterior
 from library.external  import StrategyLct, LCT
-from library.ic        import Triangle, ThreefoldWay, StrategyIc, ICM, SCM, buildTriangleFromTask
+from library.ic        import Triangle, ThreefoldWay, StrategyIc, ICM, SCM, buildTriangleFromTask, triangleKey
 from library.internal  import StrategyInt, InternalInterface
 from library.logger    import Logger
 
@@ -63,24 +63,26 @@ class Aps:
 	## createConfig
 	## --------------------------------------------------------------------
 	def createConfig(self, task=None, name=None, slots=None, config=None, itName=False):
-		""" create a config in a safe way """ 
+		""" create a config in a safe way (configs are interned by their canonical form) """ 
 		## create the config
 		config = Config(task, name, slots) if not config else config
 		## check if it already exists; if so, return existing
 		excfg  = self.findConfig(config)
 		if excfg: return excfg
 		## iterate the name if requested, store it in long-term memory
-		if itName: config.name = "cfg_%03d"%(len(self.allConfigs)+1)
+		if itName: config = config.copy("cfg_%03d"%(len(self.allConfigs)+1))
 		self.cache.permanentize(cfg = config)
 		return config
 
 	## createTriangle
 	## --------------------------------------------------------------------
 	def createTriangle(self, task=None, name=None, slots=None, triangle=None):
-		""" create a triangle in a safe way """ 
-		triangle = Triangle(task, name, slots) if not triangle else triangle
-		extri    = self.findTriangle(triangle)
+		""" create a triangle in a safe way (triangles are interned by their slots) """ 
+		## check if it already exists; if so, return existing (no need to build it then)
+		extri    = self.allTriangles.findKey(triangle.key() if triangle else triangleKey(slots))
 		if extri: return extri
+		## create the triangle, store it in long-term memory
+		triangle = Triangle(task, name, slots) if not triangle else triangle
 		self.cache.permanentize(tri = triangle)
 		return triangle
 
@@ -99,26 +101,19 @@ class Aps:
 	## --------------------------------------------------------------------
 	def findCnd(self, other):
 		""" find this version of an existing condition """
-		for cnd in self.allConditions:
-			if cnd == other: return cnd
-		return None
+		return self.allConditions.find(other)
 
 	## findCondition
 	## --------------------------------------------------------------------
 	def findCondition(self, config, prev, strategy):
 		""" finds the condition that applies to the current configuration of a given config and a specific strategy """
-		for cnd in self.allConditions:
-			if not cnd.applies(config, prev, strategy): continue
-			return cnd
-		return None
+		return self.allConditions.findKey((config.key(), strategyKey(prev), strategyKey(strategy)))
 
 	## findConfig
 	## --------------------------------------------------------------------
 	def findConfig(self, other):
 		""" find this version of an existing config """
-		for cfg in self.allConfigs:
-			if cfg == other: return cfg
-		return None
+		return self.allConfigs.findKey(other.key())
 
 	## findStrategy
 	## ------------------------------------------------------------------------
@@ -139,9 +134,7 @@ class Aps:
 	## --------------------------------------------------------------------
 	def findTriangle(self, other):
 		""" find this version of an existing triangle """
-		for tri in self.allTriangles:
-			if tri == other: return tri
-		return None
+		return self.allTriangles.findKey(other.key())
 
 	## learn
 	## --------------------------------------------------------------------
@@ -0,0 +1,48 @@
+import collections
+
+
+## Memo
+## ========================================================================
+class Memo:
+	""" bounded memo of computed results, evicting the least recently used entry, counting hits and misses """
+
+	## __init__
+	## --------------------------------------------------------------------
+	def __init__(self, limit=4096):
+		""" constructor """
+		self.limit  = limit                     ## maximum number of entries
+		self.data   = collections.OrderedDict() ## entries, least recently used first
+		self.hits   = 0                         ## number of lookups that found an entry
+		self.misses = 0                         ## number of lookups that did not
+
+	## __len__
+	## --------------------------------------------------------------------
+	def __len__(self):
+		""" length """
+		return len(self.data)
+
+	## clear
+	## --------------------------------------------------------------------
+	def clear(self):
+		""" removes all entries (the counters are kept) """
+		self.data.clear()
+
+	## get
+	## --------------------------------------------------------------------
+	def get(self, key):
+		""" retrieves an entry and marks it as recently used, returns None if not present """
+		if key not in self.data: 
+			self.misses += 1
+			return None
+		self.hits += 1
+		self.data.move_to_end(key)
+		return self.data[key]
+
+	## put
+	## --------------------------------------------------------------------
+	def put(self, key, value):
+		""" adds or replaces an entry, evicting the least recently used one if the memo is full """
+		self.data[key] = value
+		self.data.move_to_end(key)
+		if len(self.data)>self.limit: 
+			self.data.popitem(last=False)
@@ -0,0 +1,41 @@
+import json
+import os
+import random
+import sys
+
+import numpy.random
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from library.kernel import Aps
+
+examples = os.path.join(os.path.dirname(os.path.dirname(os.path.realpath(__file__))), "examples")
+
+
+## loadAps
+## ------------------------------------------------------------------------
+def loadAps(path, example, seed=1, **simulation):
+	""" loads an example problem into a fresh Aps instance (empty cache, simulation parameters overwritten as given) """
+	with open(os.path.join(examples, "%s.json"%example)) as f: j = json.load(f)
+	j["simulation"].update(simulation)
+	with open(os.path.join(path, "in.json"), "w") as f: json.dump(j, f)
+	random.seed(seed)
+	numpy.random.seed(seed)
+	aps = Aps("aps", str(path))
+	aps.load("in.json")
+	return aps
+
+## hanoi
+## ------------------------------------------------------------------------
+@pytest.fixture
+def hanoi(tmp_path):
+	""" the tower of Hanoi with three disks and three pins """
+	return loadAps(tmp_path, "towerofhanoi_3d3p")
+
+## hobbits
+## ------------------------------------------------------------------------
+@pytest.fixture
+def hobbits(tmp_path):
+	""" hobbits and orcs with two places """
+	return loadAps(tmp_path, "hobbitsandorcs_2p")
@@ -0,0 +1,42 @@
+import random
+
+import pytest
+
+from library.functions import reducePath
+
+
+## merge
+## ------------------------------------------------------------------------
+def merge(window, merged):
+	""" merges the first and last element of a window if they sum up to a multiple of three, records the merges done """
+	if (window[0]+window[-1])%3!=0: return None
+	merged.append(tuple(window))
+	return [window[0]+window[-1]] + list(window[1:-1])
+
+## reduceNaive
+## ------------------------------------------------------------------------
+def reduceNaive(path, size, merge):
+	""" reference: merges the first window that can be merged and starts over, until no window can be merged anymore """
+	for i in range(len(path)-size+1):
+		repl = merge(path[i:i+size])
+		if repl is None: continue
+		return reduceNaive(path[:i] + repl + path[i+size:], size, merge)
+	return path
+
+## test_reducePath
+## ------------------------------------------------------------------------
+@pytest.mark.parametrize("size", [2, 3, 4])
+def test_reducePath(size):
+	rng = random.Random(size)
+	for i in range(500):
+		path     = [rng.randint(0, 9) for j in range(rng.randint(0, 12))]
+		merged   = []
+		expected = []
+		assert reducePath(path[:], size, lambda x: merge(x, merged))==reduceNaive(path, size, lambda x: merge(x, expected))
+		assert merged==expected
+
+## test_reducePathShort
+## ------------------------------------------------------------------------
+def test_reducePathShort():
+	assert reducePath([3, 3], 4, lambda x: [0])==[3, 3]
+	assert reducePath([], 2, lambda x: [0])==[]
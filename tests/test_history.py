@@ -0,0 +1,63 @@
+import collections
+import random
+
+import pytest
+
+import library.kernel
+from library.internal import MoveHistory
+
+Move = collections.namedtuple("Move", "name")
+
+
+## loopStart
+## ------------------------------------------------------------------------
+def loopStart(names, dropped, size):
+	""" naive reference: index of the first occurrence of the earliest window of names that occurs again (-1 if there is none) """
+	if size > -(-len(names)//2): return -1
+	first = {}
+	start = -1
+	for i in range(len(names)-size+1):
+		window = tuple(names[i:i+size])
+		if window not in first: first[window] = i
+		elif start<0 or first[window]<start: start = first[window]
+	return start+dropped if start>-1 else -1
+
+## test_loopStart
+## ------------------------------------------------------------------------
+@pytest.mark.parametrize("size", [1, 2, 3])
+def test_loopStart(size):
+	rng     = random.Random(size)
+	history = MoveHistory(size)
+	names   = []
+	dropped = 0
+	for i in range(2000):
+		action = rng.random()
+		if action<0.6:
+			name = rng.choice("abc")
+			history.append(Move(name))
+			names.append(name)
+		elif action<0.8:
+			history.pop()
+			names = names[:-1]
+		elif len(names)>0:
+			history.drop()
+			names    = names[1:]
+			dropped += 1
+		assert history.dropped==dropped
+		assert [x.name for x in history]==names
+		assert history.loopStart()==loopStart(names, dropped, size)
+
+## test_indices
+## ------------------------------------------------------------------------
+def test_indices():
+	history = MoveHistory()
+	for name in "abcde": history.append(Move(name))
+	history.drop()
+	history.drop()
+	assert history[2].name=="c"
+	assert history[-1].name=="e"
+	assert history.get(1) is None
+	assert history.get(4).name=="e"
+	assert history.get(5) is None
+	history.truncate(3)
+	assert [x.name for x in history]==["c"]
@@ -0,0 +1,53 @@
+import json
+import os
+
+from conftest import loadAps
+from library.memo import Memo
+
+
+## test_counters
+## ------------------------------------------------------------------------
+def test_counters():
+	memo = Memo()
+	assert memo.get("a") is None
+	memo.put("a", 1)
+	assert memo.get("a")==1
+	assert memo.get("b") is None
+	assert (memo.hits, memo.misses)==(1, 2)
+
+## test_leastRecentlyUsed
+## ------------------------------------------------------------------------
+def test_leastRecentlyUsed():
+	memo = Memo(3)
+	for key in "abc": memo.put(key, key.upper())
+	memo.get("a")      ## "b" is now the least recently used entry
+	memo.put("d", "D")
+	assert len(memo)==3
+	assert memo.get("b") is None
+	assert [memo.get(x) for x in "acd"]==["A", "C", "D"]
+	memo.put("c", "E") ## replacing an entry does not evict another one
+	assert len(memo)==3
+	assert memo.get("c")=="E"
+
+## test_clearKeepsCounters
+## ------------------------------------------------------------------------
+def test_clearKeepsCounters():
+	memo = Memo()
+	memo.put("a", 1)
+	memo.get("a")
+	memo.get("b")
+	memo.clear()
+	assert len(memo)==0
+	assert memo.get("a") is None
+	assert (memo.hits, memo.misses)==(1, 2)
+
+## test_countersLogged
+## ------------------------------------------------------------------------
+def test_countersLogged(tmp_path):
+	aps = loadAps(tmp_path, "hobbitsandorcs_2p", 9, maxIts=150)
+	aps.do()
+	aps.close()
+	with open(os.path.join(str(tmp_path), "output", "aps.json")) as f: last = json.load(f)[-1]
+	for comp in (aps.int, aps.icm, aps.scm):
+		assert last[comp.name]["after"]["memo"]=={"hits": comp.memo.hits, "misses": comp.memo.misses, "entries": len(comp.memo)}
+	assert aps.icm.memo.hits>0
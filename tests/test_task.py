@@ -0,0 +1,227 @@
+import random
+
+import numpy as np
+import pytest
+
+from library.exterior import buildCounts, buildSums, copyTaskData
+
+
+## walk
+## ------------------------------------------------------------------------
+def walk(task, steps, seed=0):
+	""" applies a number of random legal moves to a task """
+	rng = random.Random(seed)
+	for i in range(steps):
+		moves = task.legalMoves()
+		if len(moves)==0: return
+		assert task.apply(*rng.choice(moves))
+
+## test_rollbackRestoresState
+## ------------------------------------------------------------------------
+def test_rollbackRestoresState(hanoi):
+	task  = hanoi.task.copy("test")
+	key   = task.stateKey()
+	state = task.stateHash
+	sp    = task.savepoint()
+	walk(task, 10)
+	assert task.stateKey()!=key
+	task.rollback(sp)
+	assert task.stateKey()==key
+	assert task.stateHash==state
+
+## test_nestedSavepoints
+## ------------------------------------------------------------------------
+def test_nestedSavepoints(hobbits):
+	task  = hobbits.task.copy("test")
+	key1  = task.stateKey()
+	sp1   = task.savepoint()
+	walk(task, 3, 1)
+	key2  = task.stateKey()
+	sp2   = task.savepoint()
+	walk(task, 3, 2)
+	task.rollback(sp2)
+	assert task.stateKey()==key2
+	task.rollback(sp1)
+	assert task.stateKey()==key1
+
+## test_releaseKeepsChanges
+## ------------------------------------------------------------------------
+def test_releaseKeepsChanges(hanoi):
+	task  = hanoi.task.copy("test")
+	sp1   = task.savepoint()
+	sp2   = task.savepoint()
+	walk(task, 4)
+	key   = task.stateKey()
+	task.release(sp2)
+	assert task.stateKey()==key
+	task.rollback(sp1)
+	assert task.stateKey()==hanoi.task.stateKey()
+
+## test_revert
+## ------------------------------------------------------------------------
+def test_revert(hanoi):
+	task  = hanoi.task.copy("test")
+	walk(task, 2)
+	key   = task.stateKey()
+	walk(task, 1, 1)
+	task.revert()
+	assert task.stateKey()==key
+
+## test_closedSavepoints
+## ------------------------------------------------------------------------
+def test_closedSavepoints(hanoi):
+	task  = hanoi.task.copy("test")
+	sp1   = task.savepoint()
+	sp2   = task.savepoint()
+	task.rollback(sp1)
+	with pytest.raises(ValueError): task.rollback(sp2)
+	with pytest.raises(ValueError): task.release (sp1)
+	## reverting a move also closes the savepoints opened after it
+	walk(task, 1)
+	sp3   = task.savepoint()
+	task.revert()
+	with pytest.raises(ValueError): task.rollback(sp3)
+
+## test_copyThenRollback
+## ------------------------------------------------------------------------
+def test_copyThenRollback(hanoi):
+	task  = hanoi.task.copy("test")
+	other = hanoi.task.copy("other")
+	walk(other, 5)
+	sp    = task.savepoint()
+	walk(task, 2)
+	## the copy replaces all items, the savepoint is kept at the state of the copy
+	copyTaskData(other, task)
+	key   = task.stateKey()
+	walk(task, 3, 1)
+	task.rollback(sp)
+	assert task.stateKey()==key
+	assert task.stateKey()==other.stateKey()
+	task.revert()
+	assert task.stateKey()==key
+
+## test_copyIsIndependent
+## ------------------------------------------------------------------------
+def test_copyIsIndependent(hanoi):
+	task  = hanoi.task
+	key   = task.stateKey()
+	state = task.stateHash
+	other = task.copy("test")
+	## the copy only refers to its own items
+	for slot in other.current:
+		assert all(x is other.getObject(x.name) for x in slot.holds)
+	for obj in other.objects:
+		assert obj.slot is None or obj.slot is other.getSlot(obj.slot.name)
+	for move in other.legalMoves():
+		assert all(x is other.getMovable(x.name) or x is other.getHandle(x.name) for x in move)
+	## moves on the copy do not touch the source
+	walk(other, 10)
+	assert other.stateKey()!=key
+	assert task .stateKey()==key
+	assert task .stateHash ==state
+	for slot in task.current:
+		assert all(x.slot is slot for x in slot.holds)
+
+## test_projectionIsIndependent
+## ------------------------------------------------------------------------
+def test_projectionIsIndependent(hanoi):
+	task  = hanoi.task
+	key   = task.stateKey()
+	ids   = frozenset(x.id for x in task.current if x.name!="pin3")
+	other = task.copy("test")
+	copyTaskData(task, other, ids)
+	assert set(x.id for x in other.current)==ids
+	walk(other, 10)
+	assert task.stateKey()==key
+
+## test_projectionCopiesHeldObjects
+## ------------------------------------------------------------------------
+def test_projectionCopiesHeldObjects(hanoi):
+	task  = hanoi.task
+	ids   = frozenset(x.id for x in task.current if x.name in ("pin2", "hand"))
+	held  = set(x.name for c in ("initial", "current", "final") for x in getattr(task, c) if x.id in ids for x in x.holds)
+	other = task.copy("test")
+	copyTaskData(task, other, ids)
+	assert set(x.name for x in other.objects)==held
+	## further objects can be requested, e.g. to reset the projection to another state
+	copyTaskData(task, other, ids, [task.getObject("disk1").id])
+	assert set(x.name for x in other.objects)==held|{"disk1"}
+
+## checkIncremental
+## ------------------------------------------------------------------------
+def checkIncremental(task):
+	""" compares the incrementally updated hashes, counts and sums of a task with the ones computed from scratch """
+	state, types = task.stateHash, task.typeHashes[:]
+	task.rehash()
+	assert task.stateHash ==state
+	assert task.typeHashes==types
+	task.scoreVector()
+	task.propSums()
+	assert np.array_equal(task.counts, buildCounts(task.current, task.symbols.size("slot")))
+	assert np.allclose   (task.sums  , buildSums  (task.current, task.values, task.symbols.size("slot")))
+
+## test_incrementalState
+## ------------------------------------------------------------------------
+@pytest.mark.parametrize("example", ["hanoi", "hobbits"])
+def test_incrementalState(example, request):
+	aps   = request.getfixturevalue(example)
+	task  = aps.task.copy("test")
+	rng   = random.Random(3)
+	keys  = []
+	for i in range(50):
+		sp = task.savepoint()
+		walk(task, 3, i)
+		checkIncremental(task)
+		keys.append(task.stateKey())
+		if rng.random()<0.5: task.rollback(sp)
+		else               : task.release (sp)
+		checkIncremental(task)
+	## jumping to a state by restore or reset
+	for key in keys:
+		task.restore(key)
+		checkIncremental(task)
+	task.reset(aps.task.config())
+	checkIncremental(task)
+	## the same state gives the same hash, in any task
+	assert task.stateHash==aps.task.stateHash
+
+## test_typeHash
+## ------------------------------------------------------------------------
+def test_typeHash(hanoi):
+	task  = hanoi.task.copy("test")
+	pins  = task.typeHash("pin")
+	## moving the hand does not change the pins
+	moves = [x for x in task.legalMoves() if x[0].modulate!="object"]
+	assert task.apply(*moves[0])
+	assert task.typeHash("pin")==pins
+	assert task.typeHash("unknown")==0
+
+## test_legalMoves
+## ------------------------------------------------------------------------
+@pytest.mark.parametrize("example", ["hanoi", "hobbits"])
+def test_legalMoves(example, request):
+	task  = request.getfixturevalue(example).task.copy("test")
+	for i in range(10):
+		legal = set((h.id, i.id, m.stype, m.id, o.id) for h,i,m,o in task.legalMoves())
+		brute = set()
+		for handle in task.handles:
+			for slotin in task.current:
+				for movable in task.objects+[x for x in task.current if x.isMovable]:
+					for slotout in task.current:
+						sp = task.savepoint()
+						if task.apply(handle, slotin, movable, slotout): brute.add((handle.id, slotin.id, movable.stype, movable.id, slotout.id))
+						task.rollback(sp)
+		assert legal==brute
+		walk(task, 1, i)
+
+## test_storeUnknownKey
+## ------------------------------------------------------------------------
+def test_storeUnknownKey(hanoi):
+	slot = hanoi.task.getSlot("hand")
+	slot.store("numberOfLayers", 1)
+	assert slot.numberOfLayers==1
+	with pytest.raises(ValueError, match="Slot hand has no parameter numberOfLayer"):
+		slot.store("numberOfLayer", 1)
+	obj  = hanoi.task.objects[0]
+	obj.store("color", "red")
+	assert obj.color=="red"